@@ -5,12 +5,16 @@ Auto-refreshed after every run. Drives scheduler's smart decisions.
 """
 import os
 import sys
-import json
 import time
+import atexit
 import random
 import sqlite3
+import threading
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
+from contextlib import contextmanager
+from collections import namedtuple
 
 if sys.platform == "win32" and hasattr(sys.stdout, "reconfigure"):
     sys.stdout.reconfigure(encoding="utf-8", errors="replace")
@@ -29,90 +33,270 @@ DB_PATH  = BASE_DIR / "analytics.db"
 # These are used until the DB has enough real data.
 # ============================================================
 PSYCHOLOGY_PEAK_HOURS = {
-    0: [7, 8, 12, 19, 20],        # Monday
-    1: [7, 8, 12, 19, 20, 21],    # Tuesday  ← statistically best day
-    2: [7, 8, 12, 19, 20, 21],    # Wednesday
-    3: [7, 8, 12, 19, 20],        # Thursday
-    4: [7, 8, 12, 19],            # Friday (afternoon drops off)
-    5: [10, 11, 12, 14, 20],      # Saturday
-    6: [11, 12, 14, 19],          # Sunday
+    0: (7, 8, 12, 19, 20),        # Monday
+    1: (7, 8, 12, 19, 20, 21),    # Tuesday  ← statistically best day
+    2: (7, 8, 12, 19, 20, 21),    # Wednesday
+    3: (7, 8, 12, 19, 20),        # Thursday
+    4: (7, 8, 12, 19),            # Friday (afternoon drops off)
+    5: (10, 11, 12, 14, 20),      # Saturday
+    6: (11, 12, 14, 19),          # Sunday
 }
 
 # Minimum views to consider a video "pumped"
 PUMP_THRESHOLD = 10_000
 
 
+# ============================================================
+# CONNECTION — one per thread, reused for the process lifetime
+# ============================================================
+_tls = threading.local()
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+)
+# journal_mode / synchronous are writer concerns; read-only handles skip them
+_RO_PRAGMAS = _PRAGMAS[2:]
+
+# Hot read queries, kept as module constants so every call hands the
+# connection's statement cache the exact same SQL and skips re-preparing.
+_SQL_BEST_HOUR = """
+    SELECT hour, avg_engagement, total_videos
+    FROM hourly_performance
+    WHERE total_videos >= 3
+    ORDER BY avg_engagement DESC LIMIT 1
+"""
+_SQL_USED_HOOKS = (
+    "SELECT hook_text FROM videos WHERE hook_text != '' "
+    "ORDER BY created_at DESC LIMIT ?"
+)
+_SQL_TODAY_COUNT = "SELECT COUNT(*) FROM videos WHERE created_at >= ?"
+
+
+def _db_uri(mode):
+    return f"{Path(DB_PATH).resolve().as_uri()}?mode={mode}"
+
+
+def _conn():
+    """Return this thread's cached read-write connection, opening it on first use."""
+    c = getattr(_tls, "c", None)
+    if c is None:
+        # isolation_level=None: transactions are driven explicitly by batch()
+        c = sqlite3.connect(_db_uri("rwc"), uri=True, check_same_thread=False,
+                            cached_statements=128, isolation_level=None)
+        # WAL + NORMAL: commits append to the WAL instead of fsyncing the
+        # main file, and dashboard readers no longer block pipeline writers.
+        try:
+            for pragma in _PRAGMAS:
+                c.execute(pragma)
+            _ensure_schema(c)
+        except BaseException:
+            # Don't cache a connection without schema (or with a dangling
+            # transaction) — the next call retries from scratch
+            c.close()
+            raise
+        _tls.c = c
+    return c
+
+
+def _ro_conn():
+    """
+    Return this thread's cached read-only connection, used by the query
+    helpers. Readers never take write locks and can't write by accident.
+    """
+    c = getattr(_tls, "ro", None)
+    if c is None:
+        _conn()  # make sure the DB file and schema exist first
+        c = sqlite3.connect(_db_uri("ro"), uri=True, check_same_thread=False,
+                            cached_statements=128)
+        for pragma in _RO_PRAGMAS:
+            c.execute(pragma)
+        _tls.ro = c
+    return c
+
+
+def _close_conn():
+    for attr in ("c", "ro"):
+        c = getattr(_tls, attr, None)
+        if c is not None:
+            c.close()
+            setattr(_tls, attr, None)
+
+
+atexit.register(_close_conn)
+
+
+@contextmanager
+def batch():
+    """
+    Group writes into one transaction (one WAL commit instead of one per call):
+
+        with analytics.batch():
+            update_performance(...)
+            update_performance(...)
+
+    Nested batches run inside a savepoint of the outermost one: an error
+    raised inside them only rolls back their own writes.
+    """
+    conn = _conn()
+    if conn.in_transaction:
+        depth     = getattr(_tls, "depth", 0)
+        name      = f"batch_{depth}"
+        _tls.depth = depth + 1
+        conn.execute(f"SAVEPOINT {name}")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute(f"ROLLBACK TO {name}")
+            conn.execute(f"RELEASE {name}")
+            raise
+        else:
+            conn.execute(f"RELEASE {name}")
+        finally:
+            _tls.depth -= 1
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    _tls.hour_data_stale = False
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        _tls.hour_data_stale = False
+        raise
+    conn.commit()
+    # Only invalidate cached query state once the writes are durable — a
+    # reader mid-batch could otherwise cache state that gets rolled back
+    if _tls.hour_data_stale:
+        _hour_data["ready"] = None
+        _tls.hour_data_stale = False
+
+
 # ============================================================
 # SCHEMA + INIT
 # ============================================================
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
+# Bump when init_db gains new DDL; stored in PRAGMA user_version so
+# already-migrated databases skip the whole block.
+_SCHEMA_VERSION = 2
+
+_schema_ready = False
+_schema_lock  = threading.Lock()
+
+
+def _ensure_schema(conn):
+    """Run init_db once per process, on the first connection opened."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            init_db(conn)
+            _schema_ready = True
+
+
+def init_db(conn=None):
+    conn = conn or _conn()
     c = conn.cursor()
 
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS videos (
-            id                INTEGER PRIMARY KEY AUTOINCREMENT,
-            run_id            TEXT UNIQUE,
-            format            TEXT,
-            topic             TEXT,
-            hook_text         TEXT,
-            voice_type        TEXT,
-            suggested_music   TEXT,
-            post_hour         INTEGER,
-            post_day_of_week  INTEGER,
-            created_at        REAL,
-            output_path       TEXT,
-            views             INTEGER DEFAULT 0,
-            likes             INTEGER DEFAULT 0,
-            comments          INTEGER DEFAULT 0,
-            shares            INTEGER DEFAULT 0,
-            watch_time_avg    REAL    DEFAULT 0,
-            engagement_rate   REAL    DEFAULT 0,
-            pumped            INTEGER DEFAULT 0,
-            youtube_id        TEXT    DEFAULT '',
-            tiktok_id         TEXT    DEFAULT '',
-            youtube_url       TEXT    DEFAULT '',
-            tiktok_url        TEXT    DEFAULT '',
-            last_stats_fetch  REAL    DEFAULT 0
-        )
-    """)
-
-    # Migration: add platform columns to existing DBs
-    for col, typedef in [
-        ("youtube_id",       "TEXT DEFAULT ''"),
-        ("tiktok_id",        "TEXT DEFAULT ''"),
-        ("youtube_url",      "TEXT DEFAULT ''"),
-        ("tiktok_url",       "TEXT DEFAULT ''"),
-        ("last_stats_fetch", "REAL DEFAULT 0"),
-    ]:
-        try:
-            c.execute(f"ALTER TABLE videos ADD COLUMN {col} {typedef}")
-        except Exception:
-            pass  # already exists
-
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS hourly_performance (
-            hour              INTEGER PRIMARY KEY,
-            avg_views         REAL    DEFAULT 0,
-            avg_engagement    REAL    DEFAULT 0,
-            total_videos      INTEGER DEFAULT 0,
-            last_updated      REAL
-        )
-    """)
-
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS format_performance (
-            format            TEXT    PRIMARY KEY,
-            avg_views         REAL    DEFAULT 0,
-            avg_engagement    REAL    DEFAULT 0,
-            total_videos      INTEGER DEFAULT 0,
-            best_topics       TEXT    DEFAULT '[]',
-            last_updated      REAL
-        )
-    """)
+    c.execute("PRAGMA user_version")
+    if c.fetchone()[0] >= _SCHEMA_VERSION:
+        return
 
+    c.execute("BEGIN")
+    try:
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS videos (
+                id                INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id            TEXT UNIQUE,
+                format            TEXT,
+                topic             TEXT,
+                hook_text         TEXT,
+                voice_type        TEXT,
+                suggested_music   TEXT,
+                post_hour         INTEGER,
+                post_day_of_week  INTEGER,
+                created_at        REAL,
+                output_path       TEXT,
+                views             INTEGER DEFAULT 0,
+                likes             INTEGER DEFAULT 0,
+                comments          INTEGER DEFAULT 0,
+                shares            INTEGER DEFAULT 0,
+                watch_time_avg    REAL    DEFAULT 0,
+                engagement_rate   REAL    DEFAULT 0,
+                pumped            INTEGER DEFAULT 0,
+                youtube_id        TEXT    DEFAULT '',
+                tiktok_id         TEXT    DEFAULT '',
+                youtube_url       TEXT    DEFAULT '',
+                tiktok_url        TEXT    DEFAULT '',
+                last_stats_fetch  REAL    DEFAULT 0
+            )
+        """)
+
+        # Migration: add platform columns to existing DBs
+        for col, typedef in [
+            ("youtube_id",       "TEXT DEFAULT ''"),
+            ("tiktok_id",        "TEXT DEFAULT ''"),
+            ("youtube_url",      "TEXT DEFAULT ''"),
+            ("tiktok_url",       "TEXT DEFAULT ''"),
+            ("last_stats_fetch", "REAL DEFAULT 0"),
+        ]:
+            try:
+                c.execute(f"ALTER TABLE videos ADD COLUMN {col} {typedef}")
+            except Exception:
+                pass  # already exists
+
+        # Indexes for the hot WHERE / ORDER BY columns
+        # (run_id is already covered by its UNIQUE constraint)
+        c.execute("""
+            CREATE INDEX IF NOT EXISTS idx_videos_dow_hour
+            ON videos(post_day_of_week, post_hour) WHERE views > 0
+        """)
+        c.execute("""
+            CREATE INDEX IF NOT EXISTS idx_videos_format_pumped
+            ON videos(format, pumped, views DESC)
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_videos_created ON videos(created_at DESC)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_videos_topic_created ON videos(topic, created_at)")
+
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS hourly_performance (
+                hour              INTEGER PRIMARY KEY,
+                avg_views         REAL    DEFAULT 0,
+                avg_engagement    REAL    DEFAULT 0,
+                total_videos      INTEGER DEFAULT 0,
+                last_updated      REAL
+            )
+        """)
+
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS format_performance (
+                format            TEXT    PRIMARY KEY,
+                avg_views         REAL    DEFAULT 0,
+                avg_engagement    REAL    DEFAULT 0,
+                total_videos      INTEGER DEFAULT 0,
+                best_topics       TEXT    DEFAULT '[]',
+                last_updated      REAL
+            )
+        """)
+
+        # Top pumped topics per format, one row per rank
+        # (replaces the JSON blob in format_performance.best_topics)
+        c.execute("""
+            CREATE TABLE IF NOT EXISTS format_top_topics (
+                format            TEXT,
+                rank              INTEGER,
+                topic             TEXT,
+                PRIMARY KEY (format, rank)
+            )
+        """)
+
+        c.execute(f"PRAGMA user_version={_SCHEMA_VERSION}")
+    except BaseException:
+        conn.rollback()
+        raise
     conn.commit()
-    conn.close()
 
 
 # ============================================================
@@ -122,27 +306,24 @@ def log_video(run_id, script_data, output_path):
     """Call this right after a video is created successfully."""
     now = datetime.now()
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("""
-            INSERT OR IGNORE INTO videos
-                (run_id, format, topic, hook_text, voice_type, suggested_music,
-                 post_hour, post_day_of_week, created_at, output_path)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            str(run_id),
-            script_data.get("format", ""),
-            script_data.get("topic", ""),
-            script_data.get("hook_text", ""),
-            script_data.get("voice_type", ""),
-            script_data.get("suggested_music", ""),
-            now.hour,
-            now.weekday(),
-            time.time(),
-            str(output_path),
-        ))
-        conn.commit()
-        conn.close()
+        with batch() as conn:
+            conn.execute("""
+                INSERT OR IGNORE INTO videos
+                    (run_id, format, topic, hook_text, voice_type, suggested_music,
+                     post_hour, post_day_of_week, created_at, output_path)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                str(run_id),
+                script_data.get("format", ""),
+                script_data.get("topic", ""),
+                script_data.get("hook_text", ""),
+                script_data.get("voice_type", ""),
+                script_data.get("suggested_music", ""),
+                now.hour,
+                now.weekday(),
+                time.time(),
+                str(output_path),
+            ))
         print(f"📊 Analytics: logged run {run_id}")
     except Exception as e:
         print(f"  [Analytics] log_video error: {e}")
@@ -152,27 +333,27 @@ def log_video(run_id, script_data, output_path):
 # UPDATE PERFORMANCE (call after you check social stats)
 # ============================================================
 def update_performance(run_id, views=0, likes=0, comments=0,
-                       shares=0, watch_time_avg=0):
+                       shares=0, watch_time_avg=0, recalc=True):
     """
     Update view/engagement metrics for a video.
     Call this manually or from a social-stats-checker script.
+    Pass recalc=False when updating many videos in a row, then call
+    recalculate_aggregates() once at the end.
     """
     engagement = (likes + comments + shares) / max(views, 1) * 100
     pumped     = 1 if views >= PUMP_THRESHOLD else 0
 
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("""
-            UPDATE videos
-            SET views=?, likes=?, comments=?, shares=?,
-                watch_time_avg=?, engagement_rate=?, pumped=?
-            WHERE run_id=?
-        """, (views, likes, comments, shares,
-              watch_time_avg, engagement, pumped, str(run_id)))
-        conn.commit()
-        conn.close()
-        _recalculate_aggregates()
+        with batch() as conn:
+            conn.execute("""
+                UPDATE videos
+                SET views=?, likes=?, comments=?, shares=?,
+                    watch_time_avg=?, engagement_rate=?, pumped=?
+                WHERE run_id=?
+            """, (views, likes, comments, shares,
+                  watch_time_avg, engagement, pumped, str(run_id)))
+            if recalc:
+                recalculate_aggregates()
         print(f"📊 Analytics: updated run {run_id} → {views:,} views, pumped={bool(pumped)}")
     except Exception as e:
         print(f"  [Analytics] update_performance error: {e}")
@@ -181,53 +362,61 @@ def update_performance(run_id, views=0, likes=0, comments=0,
 # ============================================================
 # RECALCULATE AGGREGATES
 # ============================================================
-def _recalculate_aggregates():
+def recalculate_aggregates():
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        now = time.time()
+        with batch() as conn:
+            c = conn.cursor()
+            now = time.time()
 
-        # Hourly aggregates
-        for hour in range(24):
+            # Hourly aggregates — one grouped pass instead of a query per hour
             c.execute("""
-                SELECT AVG(views), AVG(engagement_rate), COUNT(*)
-                FROM videos WHERE post_hour=? AND views > 0
-            """, (hour,))
-            row = c.fetchone()
-            if row and row[2] > 0:
-                c.execute("""
-                    INSERT OR REPLACE INTO hourly_performance
-                        (hour, avg_views, avg_engagement, total_videos, last_updated)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (hour, row[0] or 0, row[1] or 0, row[2], now))
-
-        # Format aggregates
-        for fmt in ["story_lesson", "scary_truth", "hidden_psychology"]:
+                SELECT post_hour, AVG(views), AVG(engagement_rate), COUNT(*)
+                FROM videos WHERE views > 0
+                GROUP BY post_hour
+            """)
+            c.executemany("""
+                INSERT OR REPLACE INTO hourly_performance
+                    (hour, avg_views, avg_engagement, total_videos, last_updated)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(h, v or 0, e or 0, n, now) for h, v, e, n in c.fetchall()])
+
+            # Format aggregates — driven by whichever formats actually have
+            # data: one grouped pass for the averages, one windowed pass for
+            # every format's top pumped topics
             c.execute("""
-                SELECT AVG(views), AVG(engagement_rate), COUNT(*)
-                FROM videos WHERE format=? AND views > 0
-            """, (fmt,))
-            row = c.fetchone()
+                SELECT format, AVG(views), AVG(engagement_rate), COUNT(*)
+                FROM videos WHERE views > 0 AND format != ''
+                GROUP BY format
+            """)
+            fmt_rows = c.fetchall()
 
-            # Top pumped topics for this format
             c.execute("""
-                SELECT topic FROM videos
-                WHERE format=? AND pumped=1
-                ORDER BY views DESC LIMIT 10
-            """, (fmt,))
-            topics = [r[0] for r in c.fetchall()]
-
-            if row and row[2] > 0:
-                c.execute("""
-                    INSERT OR REPLACE INTO format_performance
-                        (format, avg_views, avg_engagement, total_videos,
-                         best_topics, last_updated)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (fmt, row[0] or 0, row[1] or 0, row[2],
-                      json.dumps(topics), now))
-
-        conn.commit()
-        conn.close()
+                SELECT format, rank, topic FROM (
+                    SELECT format, topic, ROW_NUMBER() OVER (
+                        PARTITION BY format ORDER BY views DESC
+                    ) AS rank
+                    FROM videos WHERE pumped=1
+                )
+                WHERE rank <= 10
+                ORDER BY format, rank
+            """)
+            top_topics = c.fetchall()
+
+            c.executemany("""
+                INSERT OR REPLACE INTO format_performance
+                    (format, avg_views, avg_engagement, total_videos, last_updated)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(fmt, v or 0, e or 0, n, now) for fmt, v, e, n in fmt_rows])
+
+            tracked = {r[0] for r in fmt_rows}
+            c.execute("DELETE FROM format_top_topics")
+            c.executemany("""
+                INSERT INTO format_top_topics (format, rank, topic)
+                VALUES (?, ?, ?)
+            """, [r for r in top_topics if r[0] in tracked])
+            # hourly data changed — re-check lazily once the outermost
+            # batch has committed (see batch())
+            _tls.hour_data_stale = True
     except Exception as e:
         print(f"  [Analytics] recalculate error: {e}")
 
@@ -235,37 +424,62 @@ def _recalculate_aggregates():
 # ============================================================
 # QUERY HELPERS — used by scheduler
 # ============================================================
+# Whether any hour has >= 3 tracked videos. Once True it stays True; a
+# False answer (fresh install) is re-checked at most every 10 minutes, or
+# right after this process recalculates aggregates.
+_HOUR_DATA_RECHECK_S = 600
+_hour_data = {"ready": None, "checked": 0.0}
+
+
+def _hour_data_ready():
+    ready = _hour_data["ready"]
+    if ready or (ready is False and
+                 time.monotonic() - _hour_data["checked"] < _HOUR_DATA_RECHECK_S):
+        return ready
+    try:
+        row = _ro_conn().execute(
+            "SELECT 1 FROM hourly_performance WHERE total_videos >= 3 LIMIT 1"
+        ).fetchone()
+    except Exception:
+        row = None
+    _hour_data["ready"]   = row is not None
+    _hour_data["checked"] = time.monotonic()
+    return _hour_data["ready"]
+
+
+def _rng():
+    """Per-thread Random, so threaded Flask workers don't share one generator."""
+    r = getattr(_tls, "rng", None)
+    if r is None:
+        r = random.Random()
+        _tls.rng = r
+    return r
+
+
 def get_best_post_hour():
     """
     Returns the hour with highest avg engagement.
     Falls back to psychology-backed peaks if DB has < 3 data points.
     """
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("""
-            SELECT hour, avg_engagement, total_videos
-            FROM hourly_performance
-            WHERE total_videos >= 3
-            ORDER BY avg_engagement DESC LIMIT 1
-        """)
-        row = c.fetchone()
-        conn.close()
-        if row:
-            return row[0]
-    except Exception:
-        pass
+    if _hour_data_ready():
+        try:
+            conn = _ro_conn()
+            c = conn.cursor()
+            c.execute(_SQL_BEST_HOUR)
+            row = c.fetchone()
+            if row:
+                return row[0]
+        except Exception:
+            pass
 
     # Psychology default: best hour for today's day-of-week
-    today  = datetime.now().weekday()
-    peaks  = PSYCHOLOGY_PEAK_HOURS.get(today, [7, 8, 12, 19, 20])
-    return random.choice(peaks)
+    return _rng().choice(_peaks_for(datetime.now().weekday()))
 
 
 def get_best_format():
     """Returns format with highest avg views (min 3 videos tracked)."""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _ro_conn()
         c = conn.cursor()
         c.execute("""
             SELECT format, avg_views FROM format_performance
@@ -273,7 +487,6 @@ def get_best_format():
             ORDER BY avg_views DESC LIMIT 1
         """)
         row = c.fetchone()
-        conn.close()
         if row:
             return row[0]
     except Exception:
@@ -284,7 +497,7 @@ def get_best_format():
 def get_pumped_topics(format_key):
     """Return topics that have crossed the pump threshold for this format."""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _ro_conn()
         c = conn.cursor()
         c.execute("""
             SELECT topic, views FROM videos
@@ -292,7 +505,6 @@ def get_pumped_topics(format_key):
             ORDER BY views DESC LIMIT 8
         """, (format_key,))
         rows = c.fetchall()
-        conn.close()
         return [r[0] for r in rows]
     except Exception:
         return []
@@ -300,20 +512,24 @@ def get_pumped_topics(format_key):
 
 def get_all_used_topics():
     """
-    Returns {"used": [...all topics ever made...], "pumped": [...topics that went viral...]}.
+    Returns {"used": [...all topics ever made...], "pumped": frozenset(...topics that went viral...)}.
+    "used" lists each topic once, newest first (callers slice it for recency);
+    "pumped" is only ever membership-tested, so it comes back as a frozenset.
     Used by run_pipeline to skip already-used topics (unless they pumped).
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _ro_conn()
         c = conn.cursor()
-        c.execute("SELECT topic, pumped FROM videos WHERE topic != '' ORDER BY created_at DESC")
-        rows = c.fetchall()
-        conn.close()
-        used   = [r[0] for r in rows if r[0]]
-        pumped = [r[0] for r in rows if r[1] == 1 and r[0]]
+        c.execute("""
+            SELECT topic FROM videos WHERE topic != ''
+            GROUP BY topic ORDER BY MAX(created_at) DESC
+        """)
+        used = [r[0] for r in c.fetchall()]
+        c.execute("SELECT DISTINCT topic FROM videos WHERE topic != '' AND pumped=1")
+        pumped = frozenset(r[0] for r in c.fetchall())
         return {"used": used, "pumped": pumped}
     except Exception:
-        return {"used": [], "pumped": []}
+        return {"used": [], "pumped": frozenset()}
 
 
 def get_used_hooks(limit=20):
@@ -322,14 +538,10 @@ def get_used_hooks(limit=20):
     can avoid generating the same hook again.
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _ro_conn()
         c = conn.cursor()
-        c.execute(
-            "SELECT hook_text FROM videos WHERE hook_text != '' ORDER BY created_at DESC LIMIT ?",
-            (limit,)
-        )
+        c.execute(_SQL_USED_HOOKS, (limit,))
         rows = c.fetchall()
-        conn.close()
         return [r[0] for r in rows if r[0]]
     except Exception:
         return []
@@ -342,35 +554,28 @@ def get_viral_candidates():
     Returns list of dicts: {run_id, topic, format, views, hook_text}
     """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
+        c = _ro_conn().cursor()
         c.execute("""
-            SELECT run_id, topic, format, views, hook_text, created_at
-            FROM videos
-            WHERE pumped=1 AND topic != ''
-            ORDER BY views DESC
+            SELECT v.run_id, v.topic, v.format, v.views, v.hook_text
+            FROM videos v
+            WHERE v.pumped=1 AND v.topic != ''
+              AND NOT EXISTS (
+                  SELECT 1 FROM videos w
+                  WHERE w.topic=v.topic AND w.created_at > v.created_at
+                    AND w.run_id != v.run_id
+              )
+            ORDER BY v.views DESC
         """)
-        pumped = c.fetchall()
-
-        results = []
-        for row in pumped:
-            run_id, topic, fmt, views, hook_text, created_at = row
-            # Check if a follow-up was already made (any video with same topic made after this one)
-            c.execute("""
-                SELECT COUNT(*) FROM videos
-                WHERE topic=? AND created_at > ? AND run_id != ?
-            """, (topic, created_at, run_id))
-            followup_count = c.fetchone()[0]
-            if followup_count == 0:
-                results.append({
-                    "run_id":    run_id,
-                    "topic":     topic,
-                    "format":    fmt,
-                    "views":     views,
-                    "hook_text": hook_text,
-                })
-        conn.close()
-        return results
+        return [
+            {
+                "run_id":    run_id,
+                "topic":     topic,
+                "format":    fmt,
+                "views":     views,
+                "hook_text": hook_text,
+            }
+            for run_id, topic, fmt, views, hook_text in c.fetchall()
+        ]
     except Exception:
         return []
 
@@ -379,20 +584,25 @@ def get_today_video_count():
     """How many videos have been created today."""
     today_start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _ro_conn()
         c = conn.cursor()
-        c.execute("SELECT COUNT(*) FROM videos WHERE created_at >= ?", (today_start,))
+        c.execute(_SQL_TODAY_COUNT, (today_start,))
         count = c.fetchone()[0]
-        conn.close()
         return count
     except Exception:
         return 0
 
 
-def get_psychology_peaks_today():
-    """Return psychology-backed peak hours for today."""
-    today = datetime.now().weekday()
-    return PSYCHOLOGY_PEAK_HOURS.get(today, [7, 8, 12, 19, 20])
+@lru_cache(maxsize=7)
+def _peaks_for(day_of_week):
+    return PSYCHOLOGY_PEAK_HOURS.get(day_of_week, (7, 8, 12, 19, 20))
+
+
+def get_psychology_peaks_today(day_of_week=None):
+    """Return psychology-backed peak hours (a tuple) for today, or for day_of_week."""
+    if day_of_week is None:
+        day_of_week = datetime.now().weekday()
+    return _peaks_for(day_of_week)
 
 
 def get_best_hours_for_day(day_of_week, n=4):
@@ -404,40 +614,7 @@ def get_best_hours_for_day(day_of_week, n=4):
       3. Empty list → caller uses psychology peaks
     Hours are returned sorted by avg_engagement descending.
     """
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-
-        # Tier 1: day-specific learned hours
-        c.execute("""
-            SELECT post_hour, AVG(engagement_rate) as avg_eng, COUNT(*) as cnt
-            FROM videos
-            WHERE post_day_of_week = ? AND views > 0
-            GROUP BY post_hour
-            HAVING cnt >= 2
-            ORDER BY avg_eng DESC
-            LIMIT ?
-        """, (day_of_week, n))
-        rows = c.fetchall()
-
-        if rows:
-            conn.close()
-            return [r[0] for r in rows]
-
-        # Tier 2: any-day overall hourly data
-        c.execute("""
-            SELECT hour, avg_engagement, total_videos
-            FROM hourly_performance
-            WHERE total_videos >= 3
-            ORDER BY avg_engagement DESC
-            LIMIT ?
-        """, (n,))
-        rows2 = c.fetchall()
-        conn.close()
-        return [r[0] for r in rows2] if rows2 else []
-
-    except Exception:
-        return []
+    return get_schedule_insights(day_of_week, n).hours
 
 
 def save_platform_ids(run_id, youtube_id=None, tiktok_id=None):
@@ -447,15 +624,12 @@ def save_platform_ids(run_id, youtube_id=None, tiktok_id=None):
     yt_url = f"https://youtube.com/shorts/{yt_id}" if yt_id else ""
     tt_url = f"https://www.tiktok.com/@/video/{tt_id}" if tt_id else ""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("""
-            UPDATE videos
-            SET youtube_id=?, tiktok_id=?, youtube_url=?, tiktok_url=?
-            WHERE run_id=?
-        """, (yt_id, tt_id, yt_url, tt_url, str(run_id)))
-        conn.commit()
-        conn.close()
+        with batch() as conn:
+            conn.execute("""
+                UPDATE videos
+                SET youtube_id=?, tiktok_id=?, youtube_url=?, tiktok_url=?
+                WHERE run_id=?
+            """, (yt_id, tt_id, yt_url, tt_url, str(run_id)))
     except Exception as e:
         print(f"  [Analytics] save_platform_ids error: {e}")
 
@@ -468,7 +642,7 @@ def get_videos_for_stats_fetch(max_age_days=30):
     """
     cutoff = time.time() - max_age_days * 86400
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _ro_conn()
         c = conn.cursor()
         c.execute("""
             SELECT run_id, youtube_id, tiktok_id, views, likes, comments, shares
@@ -478,7 +652,6 @@ def get_videos_for_stats_fetch(max_age_days=30):
             ORDER BY created_at DESC
         """, (cutoff,))
         rows = c.fetchall()
-        conn.close()
         return [
             {
                 "run_id":     r[0],
@@ -500,33 +673,79 @@ def get_hour_confidence(day_of_week):
     Returns a dict with learning status for today:
       {"day_videos": int, "any_videos": int, "data_driven": bool, "tier": str}
     """
+    ins = get_schedule_insights(day_of_week)
+    return {
+        "day_videos": ins.day_videos,
+        "any_videos": ins.any_videos,
+        "data_driven": ins.data_driven,
+        "tier": ins.tier,
+    }
+
+
+ScheduleInsights = namedtuple(
+    "ScheduleInsights", "hours day_videos any_videos tier data_driven"
+)
+
+_SQL_SCHEDULE_INSIGHTS = """
+    WITH day AS (
+        SELECT post_hour AS h, AVG(engagement_rate) AS e
+        FROM videos
+        WHERE post_day_of_week = :dow AND views > 0
+        GROUP BY post_hour
+        HAVING COUNT(*) >= 2
+        ORDER BY e DESC
+        LIMIT :n
+    ),
+    cross_day AS (
+        SELECT hour AS h, avg_engagement AS e
+        FROM hourly_performance
+        WHERE total_videos >= 3
+        ORDER BY avg_engagement DESC
+        LIMIT :n
+    ),
+    counts AS (
+        SELECT COALESCE(SUM(post_day_of_week = :dow), 0) AS day_total,
+               COUNT(*) AS any_total
+        FROM videos WHERE views > 0
+    )
+    SELECT 0, day_total, any_total FROM counts
+    UNION ALL SELECT 1, h, e FROM day
+    UNION ALL SELECT 2, h, e FROM cross_day
+"""
+
+
+def get_schedule_insights(day_of_week, n=4):
+    """
+    One-query combination of get_best_hours_for_day + get_hour_confidence,
+    for callers that need both (dashboard /api/schedule, scheduler).
+    Returns ScheduleInsights(hours, day_videos, any_videos, tier, data_driven).
+    """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute(
-            "SELECT COUNT(*) FROM videos WHERE post_day_of_week = ? AND views > 0",
-            (day_of_week,)
-        )
-        day_count = c.fetchone()[0]
-        c.execute("SELECT COUNT(*) FROM videos WHERE views > 0")
-        any_count = c.fetchone()[0]
-        conn.close()
-
-        if day_count >= 4:
-            tier = "day-specific"
-        elif any_count >= 6:
-            tier = "cross-day"
-        else:
-            tier = "psychology"
-
-        return {
-            "day_videos": day_count,
-            "any_videos": any_count,
-            "data_driven": tier != "psychology",
-            "tier": tier,
-        }
+        rows = _ro_conn().execute(_SQL_SCHEDULE_INSIGHTS,
+                               {"dow": day_of_week, "n": n}).fetchall()
     except Exception:
-        return {"day_videos": 0, "any_videos": 0, "data_driven": False, "tier": "psychology"}
+        rows = []
+
+    day_count = any_count = 0
+    tiers = {1: [], 2: []}
+    for src, a, b in rows:
+        if src == 0:
+            day_count, any_count = a, b
+        else:
+            tiers[src].append((b, a))
+
+    # Tier 1 (day-specific) wins over tier 2 (cross-day); best engagement first
+    learned = tiers[1] or tiers[2]
+    hours = [h for _, h in sorted(learned, key=lambda r: r[0], reverse=True)]
+
+    if day_count >= 4:
+        tier = "day-specific"
+    elif any_count >= 6:
+        tier = "cross-day"
+    else:
+        tier = "psychology"
+
+    return ScheduleInsights(hours, day_count, any_count, tier, tier != "psychology")
 
 
 # ============================================================
@@ -534,7 +753,7 @@ def get_hour_confidence(day_of_week):
 # ============================================================
 def print_analytics_summary():
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = _ro_conn()
         c = conn.cursor()
 
         c.execute("SELECT COUNT(*), AVG(views), MAX(views) FROM videos")
@@ -555,7 +774,6 @@ def print_analytics_summary():
         """)
         fmt_rows = c.fetchall()
 
-        conn.close()
 
         print("\n" + "="*55)
         print("  📊 DARK MIND ANALYTICS SUMMARY")
@@ -580,12 +798,6 @@ def print_analytics_summary():
         print(f"  [Analytics] summary error: {e}")
 
 
-# ============================================================
-# AUTO-INIT
-# ============================================================
-init_db()
-
-
 if __name__ == "__main__":
     print_analytics_summary()
     print(f"\n  Best post hour today : {get_best_post_hour():02d}:00")
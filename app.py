@@ -5,10 +5,12 @@ import subprocess
 import threading
 import time
 import uuid
+from collections import deque
 from datetime import datetime
 from functools import wraps
 from pathlib import Path
 
+import orjson
 from dotenv import load_dotenv
 from flask import (
     Flask,
@@ -35,14 +37,20 @@ else:
     app.secret_key = _sk
 
 BASE_DIR = Path(__file__).parent
-HISTORY_FILE = BASE_DIR / "run_history.json"
+HISTORY_FILE = BASE_DIR / "run_history.jsonl"
+LEGACY_HISTORY_FILE = BASE_DIR / "run_history.json"
 SETTINGS_FILE = BASE_DIR / "settings.json"
+_WEEKDAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday",
+                  "Friday", "Saturday", "Sunday")
 ALLOWED_SCRIPTS = {
     "run_pipeline":    "run_pipeline.py",
     "image_generator": "image_generator.py",
     "assembler":       "assembler.py",
 }
 
+# Max queued log lines flushed together as one SSE write
+SSE_BATCH_MAX = 32
+
 # In-memory store for active runs: run_id -> {"proc": Popen, "queue": Queue, "done": bool}
 active_runs: dict = {}
 active_runs_lock = threading.Lock()
@@ -59,23 +67,72 @@ def get_password() -> str:
     return os.getenv("DASHBOARD_PASSWORD", "changeme")
 
 
+# Run history is an append-only JSONL log (oldest first). Each finished run
+# appends one line; the file is compacted back to HISTORY_MAX entries once
+# it reaches twice that. Parsed results are reused until mtime/size change,
+# so dashboard polling of /history rarely touches the parser.
+HISTORY_MAX = 200
+_history_cache: dict = {"key": None, "data": [], "lines": 0}
+_history_lock = threading.Lock()
+
+
+def _migrate_legacy_history() -> None:
+    """One-time conversion of the old whole-file run_history.json."""
+    if HISTORY_FILE.exists() or not LEGACY_HISTORY_FILE.exists():
+        return
+    try:
+        save_history(orjson.loads(LEGACY_HISTORY_FILE.read_bytes()))
+        LEGACY_HISTORY_FILE.unlink()
+    except (orjson.JSONDecodeError, OSError):
+        pass
+
+
 def load_history() -> list:
-    if HISTORY_FILE.exists():
+    """Return the run history, newest first. The list is shared — copy before mutating."""
+    try:
+        st = HISTORY_FILE.stat()
+    except OSError:
+        return []
+    key = (st.st_mtime_ns, st.st_size)
+    if _history_cache["key"] != key:
+        tail: deque = deque(maxlen=HISTORY_MAX)
+        lines = 0
         try:
-            return json.loads(HISTORY_FILE.read_text(encoding="utf-8"))
-        except (json.JSONDecodeError, OSError):
+            with HISTORY_FILE.open("rb") as f:
+                for raw in f:
+                    lines += 1
+                    tail.append(raw)
+        except OSError:
             return []
-    return []
+        data = []
+        for raw in reversed(tail):
+            try:
+                data.append(orjson.loads(raw))
+            except orjson.JSONDecodeError:
+                continue  # torn/partial line
+        _history_cache.update(key=key, data=data, lines=lines)
+    return _history_cache["data"]
 
 
 def save_history(history: list) -> None:
-    HISTORY_FILE.write_text(json.dumps(history, indent=2), encoding="utf-8")
+    """Rewrite the whole log from a newest-first list (used for compaction)."""
+    tmp = HISTORY_FILE.with_suffix(".tmp")
+    tmp.write_bytes(b"".join(orjson.dumps(e) + b"\n" for e in reversed(history)))
+    os.replace(tmp, HISTORY_FILE)
 
 
 def append_run(entry: dict) -> None:
-    history = load_history()
-    history.insert(0, entry)
-    save_history(history[:200])  # keep at most 200 entries
+    with _history_lock:
+        load_history()  # make sure the line count is current
+        with HISTORY_FILE.open("ab") as f:
+            f.write(orjson.dumps(entry) + b"\n")
+        # Keep the cache in step with the file instead of re-reading it
+        st = HISTORY_FILE.stat()
+        _history_cache["key"] = (st.st_mtime_ns, st.st_size)
+        _history_cache["data"] = [entry, *_history_cache["data"][:HISTORY_MAX - 1]]
+        _history_cache["lines"] += 1
+        if _history_cache["lines"] >= 2 * HISTORY_MAX:
+            save_history(load_history()[:HISTORY_MAX])
 
 
 def load_settings() -> dict:
@@ -91,6 +148,9 @@ def save_settings(settings: dict) -> None:
     SETTINGS_FILE.write_text(json.dumps(settings, indent=2), encoding="utf-8")
 
 
+_migrate_legacy_history()
+
+
 def login_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
@@ -152,7 +212,8 @@ def run_script(script: str):
         running_script["script"] = script
         running_script["run_id"] = run_id
 
-    started_at = datetime.utcnow().isoformat() + "Z"
+    started_dt = datetime.utcnow()
+    started_at = started_dt.isoformat() + "Z"
 
     def worker():
         log_lines = []
@@ -163,11 +224,22 @@ def run_script(script: str):
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
                 cwd=str(BASE_DIR),
-                text=True,
-                bufsize=1,
+                bufsize=1 << 16,
             )
-            for line in proc.stdout:
-                line = line.rstrip("\n")
+            # Read whatever is available in up-to-64KB chunks and split it
+            # ourselves — far less per-line overhead than text-mode iteration
+            pending = b""
+            while True:
+                chunk = proc.stdout.read1(1 << 16)
+                if not chunk:
+                    break
+                *lines, pending = (pending + chunk).split(b"\n")
+                for raw in lines:
+                    line = raw.rstrip(b"\r").decode("utf-8", "replace")
+                    q.put(line)
+                    log_lines.append(line)
+            if pending:
+                line = pending.rstrip(b"\r").decode("utf-8", "replace")
                 q.put(line)
                 log_lines.append(line)
             proc.wait()
@@ -177,9 +249,8 @@ def run_script(script: str):
             q.put(f"[DASHBOARD ERROR] {exc}")
             status = "error"
         finally:
-            ended_at = datetime.utcnow().isoformat() + "Z"
-            started_dt = datetime.fromisoformat(started_at.rstrip("Z"))
-            ended_dt = datetime.fromisoformat(ended_at.rstrip("Z"))
+            ended_dt = datetime.utcnow()
+            ended_at = ended_dt.isoformat() + "Z"
             duration_s = round((ended_dt - started_dt).total_seconds(), 1)
 
             snippet = "\n".join(log_lines[-10:])
@@ -224,12 +295,26 @@ def stream(run_id: str):
                     break
                 continue
 
-            if line is None:
-                yield "event: done\ndata: [run complete]\n\n"
-                break
+            # Drain whatever else is already queued so a burst of log lines
+            # goes out as one write instead of one per line
+            batch = [line]
+            try:
+                while line is not None and len(batch) < SSE_BATCH_MAX:
+                    line = q.get_nowait()
+                    batch.append(line)
+            except queue.Empty:
+                pass
+
+            finished = batch[-1] is None
             # Escape data for SSE
-            safe = line.replace("\n", " ")
-            yield f"data: {safe}\n\n"
+            safe = (s.replace("\n", " ") for s in batch if s is not None)
+            frames = "".join(f"data: {s}\n\n" for s in safe)
+            if finished:
+                frames += "event: done\ndata: [run complete]\n\n"
+            if frames:
+                yield frames
+            if finished:
+                break
 
     return Response(generate(), mimetype="text/event-stream",
                     headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -255,20 +340,19 @@ def status():
 @login_required
 def get_schedule():
     try:
-        from analytics import get_best_hours_for_day, get_psychology_peaks_today, get_hour_confidence
-        now     = datetime.utcnow()  # noqa — datetime imported at top
+        from analytics import get_schedule_insights, get_psychology_peaks_today
         weekday = datetime.now().weekday()
 
         settings = load_settings()
         max_vids = settings.get("max_videos_per_day", 4)
 
-        learned = get_best_hours_for_day(weekday, n=max_vids)
-        psych   = get_psychology_peaks_today()
-        conf    = get_hour_confidence(weekday)
+        insights = get_schedule_insights(weekday, n=max_vids)
+        learned  = insights.hours
+        psych    = get_psychology_peaks_today(weekday)
 
         # Build combined schedule (same logic as scheduler.py)
         seen, combined = set(), []
-        for h in (learned + psych):
+        for h in (*learned, *psych):
             if h not in seen:
                 seen.add(h)
                 combined.append(h)
@@ -278,18 +362,17 @@ def get_schedule():
         import random as _random
         chosen = [(h, _random.randint(5, 55)) for h in chosen_hours]
 
-        from datetime import datetime as _dt
-        today_name = _dt.now().strftime("%A")
+        today_name = _WEEKDAY_NAMES[weekday]
 
         return jsonify({
             "today":           today_name,
             "schedule":        [f"{h:02d}:{m:02d}" for h, m in chosen],
             "learned_hours":   [f"{h:02d}:00" for h in learned],
             "psych_hours":     [f"{h:02d}:00" for h in sorted(set(psych))[:6]],
-            "tier":            conf.get("tier", "psychology"),
-            "day_videos":      conf.get("day_videos", 0),
-            "any_videos":      conf.get("any_videos", 0),
-            "data_driven":     conf.get("data_driven", False),
+            "tier":            insights.tier,
+            "day_videos":      insights.day_videos,
+            "any_videos":      insights.any_videos,
+            "data_driven":     insights.data_driven,
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
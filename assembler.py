@@ -14,15 +14,21 @@ import os
 import re
 import sys
 import json
+import atexit
 import time
 import glob
 import shutil
 import random
 import subprocess
 import warnings
+import threading
 import requests
 import urllib3
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeout
+from urllib3.util.retry import Retry
 from pathlib import Path
+from functools import lru_cache
+from itertools import accumulate
 from dotenv import load_dotenv
 
 # Suppress SSL warnings from verify=False (ccMixter SSL cert issue on Windows)
@@ -39,6 +45,29 @@ TEMP_DIR    = BASE_DIR / "temp"
 FONTS_DIR   = BASE_DIR / "fonts"
 OUTPUT_DIR  = BASE_DIR / "output"
 
+
+def _ram_temp_dir():
+    """
+    DARKMIND_RAM_TEMP keeps the intermediate MP4s (Ken Burns renders,
+    concat, captioned) off the disk: "true" uses a per-process dir in
+    /dev/shm on Linux, any other value is taken as a directory path
+    (e.g. R:\\tmp on a Windows RAM drive). Returns None when unset.
+    """
+    ram = os.getenv("DARKMIND_RAM_TEMP", "").strip()
+    if not ram or ram.lower() == "false":
+        return None
+    if ram.lower() == "true":
+        if not os.path.isdir("/dev/shm"):
+            print("⚠️  DARKMIND_RAM_TEMP=true but no /dev/shm — using temp/")
+            return None
+        path = Path("/dev/shm") / f"darkmind_{os.getpid()}"
+        atexit.register(shutil.rmtree, path, ignore_errors=True)
+        return path
+    return Path(ram)
+
+
+TEMP_DIR = _ram_temp_dir() or TEMP_DIR
+
 PIXABAY_API_KEY = os.getenv("PIXABAY_API_KEY")
 
 # ============================================================
@@ -64,37 +93,73 @@ FONT_URLS = {
 IMPACT_FONT = Path("C:/Windows/Fonts/impact.ttf")
 
 
+# One pooled session for the module's HTTP calls (keep-alive across fonts,
+# Commons/Leonardo/Picsum lookups). Retry only covers idempotent methods.
+_HTTP = requests.Session()
+_HTTP.mount("https://", requests.adapters.HTTPAdapter(
+    pool_connections=8, pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.3),
+))
+_HTTP.headers.update({"User-Agent": "DarkMindBot/1.0"})
+
+
+_FONT_MAGIC = (b"\x00\x01\x00\x00", b"OTTO", b"true")   # TrueType / CFF / Apple
+
+
+def _download_font(fname, urls):
+    dest = FONTS_DIR / fname
+    tmp  = dest.with_suffix(".part")
+    print(f"📥 Downloading font: {fname}...")
+    for url in urls:
+        try:
+            # Stream into a .part file and only rename it into place once it
+            # looks like a complete font — never leave a truncated file or an
+            # HTML error page behind under the real name.
+            with _HTTP.get(url, timeout=30, stream=True) as r:
+                if r.status_code != 200:
+                    print(f"   ⚠️  {url[:60]} → {r.status_code}")
+                    continue
+                r.raw.decode_content = True
+                with open(tmp, "wb") as fh:
+                    shutil.copyfileobj(r.raw, fh, length=1 << 16)
+            size = tmp.stat().st_size
+            with open(tmp, "rb") as fh:
+                magic = fh.read(4)
+            if size > 10_000 and magic in _FONT_MAGIC:
+                tmp.replace(dest)
+                print(f"   ✅ {fname} saved ({size//1024}KB)")
+                return
+            print(f"   ⚠️  {url[:60]} → not a font ({size} bytes)")
+        except Exception as e:
+            print(f"   ⚠️  {url[:60]} → {e.__class__.__name__}")
+    tmp.unlink(missing_ok=True)
+    if not (dest.exists() and dest.stat().st_size > 10_000):
+        print(f"   ❌ Could not download {fname} — captions will use Arial")
+
+
 def ensure_fonts():
     FONTS_DIR.mkdir(exist_ok=True)
-    for fname, urls in FONT_URLS.items():
-        dest = FONTS_DIR / fname
-        if dest.exists() and dest.stat().st_size > 10_000:   # valid font > 10KB
-            continue
-        print(f"📥 Downloading font: {fname}...")
-        for url in urls:
-            try:
-                r = requests.get(url, timeout=30)
-                if r.status_code == 200 and len(r.content) > 10_000:
-                    dest.write_bytes(r.content)
-                    print(f"   ✅ {fname} saved ({len(r.content)//1024}KB)")
-                    break
-                else:
-                    print(f"   ⚠️  {url[:60]} → {r.status_code}")
-            except Exception as e:
-                print(f"   ⚠️  {url[:60]} → {e.__class__.__name__}")
-        else:
-            if not (dest.exists() and dest.stat().st_size > 10_000):
-                print(f"   ❌ Could not download {fname} — captions will use Arial")
+    missing = [
+        (fname, urls) for fname, urls in FONT_URLS.items()
+        if not ((FONTS_DIR / fname).exists() and (FONTS_DIR / fname).stat().st_size > 10_000)  # valid font > 10KB
+    ]
+    if not missing:
+        return
+    # Fonts are independent — fetch them side by side
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(lambda item: _download_font(*item), missing))
+
 
+_FF_PATH_ESCAPE = str.maketrans({"\\": "/", ":": "\\:"})
 
+
+@lru_cache(maxsize=32)
 def ffmpeg_font_path(font_path):
     """
     Convert a font path to FFmpeg filter-safe string.
     Escapes drive-letter colon for Windows (C: → C\\:).
     """
-    p = str(font_path).replace("\\", "/")
-    p = p.replace(":", "\\:")
-    return p
+    return str(font_path).translate(_FF_PATH_ESCAPE)
 
 
 # ============================================================
@@ -112,8 +177,46 @@ MOOD_QUERIES = {
     "lofi":        "lofi dark chill",
 }
 
-# Track used tracks this session to avoid repeats
-_used_music_urls: set = set()
+# Tracks already used / URLs known to be dead, persisted across runs so the
+# next run skips them without touching the network. temp/ is wiped by
+# run_pipeline, so the file lives next to the code.
+MUSIC_CACHE_FILE = BASE_DIR / "music_cache.json"
+_MUSIC_USED_TTL  = 30 * 86400   # don't reuse a track within a month
+_MUSIC_BAD_TTL   = 7 * 86400    # dead links get another chance after a week
+
+
+def _load_music_cache():
+    try:
+        data = json.loads(MUSIC_CACHE_FILE.read_text(encoding="utf-8"))
+    except Exception:
+        return {}, {}
+    now  = time.time()
+    used = {u: t for u, t in data.get("used", {}).items() if now - t < _MUSIC_USED_TTL}
+    bad  = {u: t for u, t in data.get("bad", {}).items() if now - t < _MUSIC_BAD_TTL}
+    return used, bad
+
+
+_music_cache_lock = threading.Lock()
+
+
+def _save_music_cache():
+    """Write the cache atomically — after every landed track and again at exit."""
+    if not (_used_music_urls or _bad_music_urls):
+        return
+    with _music_cache_lock:
+        try:
+            tmp = MUSIC_CACHE_FILE.with_suffix(".tmp")
+            tmp.write_text(json.dumps({"used": dict(_used_music_urls),
+                                       "bad":  dict(_bad_music_urls)}),
+                           encoding="utf-8")
+            os.replace(tmp, MUSIC_CACHE_FILE)
+        except Exception as e:
+            print(f"⚠️  Could not save music cache: {e}")
+
+
+# url → unix time it was used / found bad
+_used_music_urls, _bad_music_urls = _load_music_cache()
+atexit.register(_save_music_cache)
 
 
 # ============================================================
@@ -158,13 +261,30 @@ XFADE_DUR = {"fast": 0.12, "medium": 0.18, "slow": 0.25}
 PACE_DURATIONS = {"fast": 2.0, "medium": 4.5, "slow": 8.0}
 
 
+_beat_map_cache = (None, 0, {})
+
+
+def _beat_map(script_data):
+    """
+    {beat number: beat dict} for script_data["beats"], rebuilt only when a
+    different beats list comes in. Kept off script_data itself since that
+    dict gets written back out as JSON.
+    """
+    global _beat_map_cache
+    beats = script_data.get("beats", [])
+    cached_beats, cached_len, bm = _beat_map_cache
+    if cached_beats is not beats or cached_len != len(beats):
+        bm = {b.get("beat"): b for b in beats}
+        _beat_map_cache = (beats, len(beats), bm)
+    return bm
+
+
 def calculate_beat_durations(visuals, script_data, total_duration):
     """
     Assign each visual a duration proportional to its beat's pace.
     Total always equals total_duration (voiceover length).
     """
-    beats    = script_data.get("beats", [])
-    beat_map = {b.get("beat"): b for b in beats}
+    beat_map = _beat_map(script_data)
 
     raw = []
     for vis in visuals:
@@ -202,38 +322,77 @@ def calculate_beat_durations(visuals, script_data, total_duration):
 
 def get_beat_camera_motion(vis, script_data):
     """Return the camera_motion string for this visual's beat, or None."""
-    beats    = script_data.get("beats", [])
-    beat_map = {b.get("beat"): b for b in beats}
-    beat_data = beat_map.get(vis.get("beat"), {})
+    beat_data = _beat_map(script_data).get(vis.get("beat"), {})
     return beat_data.get("camera_motion")
 
 
 # ============================================================
 # FFMPEG HELPERS
 # ============================================================
-def run_ffmpeg(cmd, description=""):
+# x264 settings for intermediate files that get re-encoded downstream anyway:
+# speed over compression. Only the final mix keeps "-preset fast".
+INTERMEDIATE_X264 = ["-preset", "ultrafast", "-tune", "zerolatency", "-g", "60"]
+
+
+def _drain_tail(stream, tail, keep=600):
+    """Read a pipe to EOF, keeping only the last `keep` bytes in `tail`."""
+    for block in iter(lambda: stream.read(1 << 16), b""):
+        tail += block
+        del tail[:-keep]
+
+
+def run_ffmpeg(cmd, description="", stdin_data=None):
+    """Run an ffmpeg command. stdin_data (bytes) is piped in for `-i pipe:0` inputs."""
     try:
         print(f"⚙️  {description}...")
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
+        # stderr is drained on a thread so a chatty encode never stalls on a
+        # full pipe, and only the tail we print is ever held in memory.
+        proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE if stdin_data is not None else subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            bufsize=1 << 20,
+        )
+        tail   = bytearray()
+        reader = threading.Thread(target=_drain_tail, args=(proc.stderr, tail), daemon=True)
+        reader.start()
+        if stdin_data is not None:
+            try:
+                proc.stdin.write(stdin_data)
+            except BrokenPipeError:
+                pass    # ffmpeg exited early — the return code reports it
+            finally:
+                proc.stdin.close()
+        returncode = proc.wait()
+        reader.join()
+        if returncode == 0:
             print(f"✅ {description} done")
             return True
         print(f"❌ {description} failed")
-        print(result.stderr[-600:] if result.stderr else "No stderr")
+        print(tail.decode(errors="replace") or "No stderr")
         return False
     except Exception as e:
         print(f"❌ FFmpeg exception: {e}")
         return False
 
 
+@lru_cache(maxsize=64)
+def _probe_duration(path, mtime_ns, size):
+    # mtime/size are only part of the cache key — a rewritten file is re-probed
+    result = subprocess.run(
+        ["ffprobe", "-v", "error",
+         "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", path],
+        capture_output=True, text=True,
+    )
+    return float(result.stdout.strip())
+
+
 def get_audio_duration(path):
     try:
-        result = subprocess.run(
-            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-             "-of", "default=noprint_wrappers=1:nokey=1", path],
-            capture_output=True, text=True,
-        )
-        return float(result.stdout.strip())
+        st = os.stat(path)
+        return _probe_duration(os.path.abspath(path), st.st_mtime_ns, st.st_size)
     except Exception:
         return 60.0
 
@@ -241,6 +400,39 @@ def get_audio_duration(path):
 # ============================================================
 # WHISPER — WORD TIMESTAMPS (upgraded to "small" model)
 # ============================================================
+_whisper_model = None
+_whisper_lock  = threading.Lock()
+
+
+def _get_whisper():
+    """
+    Load the Whisper model once per process and reuse it.
+    CUDA (small, float16) when a GPU is visible, else CPU int8 base → tiny.
+    """
+    global _whisper_model
+    with _whisper_lock:
+        if _whisper_model is not None:
+            return _whisper_model
+        from faster_whisper import WhisperModel
+        candidates = [("base", "cpu", "int8"), ("tiny", "cpu", "int8")]
+        try:
+            import ctranslate2
+            if ctranslate2.get_cuda_device_count() > 0:
+                candidates.insert(0, ("small", "cuda", "float16"))
+        except Exception:
+            pass
+        for model_name, device, compute_type in candidates:
+            try:
+                kwargs = {"cpu_threads": os.cpu_count() or 4} if device == "cpu" else {}
+                _whisper_model = WhisperModel(model_name, device=device,
+                                              compute_type=compute_type, **kwargs)
+                print(f"   Whisper model: {model_name} ({device})")
+                break
+            except Exception as e:
+                print(f"   ⚠️  Whisper '{model_name}' ({device}) failed: {e.__class__.__name__} — trying next...")
+        return _whisper_model
+
+
 def get_word_timestamps(audio_path, time_offset=0.0):
     """
     Returns list of {"word", "start", "end"} dicts.
@@ -249,30 +441,20 @@ def get_word_timestamps(audio_path, time_offset=0.0):
     """
     print("🎯 Running Whisper for word timestamps...")
     try:
-        from faster_whisper import WhisperModel
-        model = None
-        for model_name in ["base", "tiny"]:
-            try:
-                model = WhisperModel(model_name, device="cpu", compute_type="int8")
-                print(f"   Whisper model: {model_name}")
-                break
-            except Exception as e:
-                print(f"   ⚠️  Whisper '{model_name}' failed: {e.__class__.__name__} — trying smaller...")
+        model = _get_whisper()
         if model is None:
             print("❌ Whisper: no model could be loaded")
             return None
 
-        segments, _ = model.transcribe(audio_path, word_timestamps=True, language="en")
-
-        words = []
-        for seg in segments:
-            if seg.words:
-                for wd in seg.words:
-                    words.append({
-                        "word":  wd.word.strip(),
-                        "start": wd.start + time_offset,
-                        "end":   wd.end   + time_offset,
-                    })
+        # Greedy decoding is plenty for caption timing
+        segments, _ = model.transcribe(audio_path, word_timestamps=True, language="en",
+                                       beam_size=1)
+
+        words = [
+            {"word": wd.word.strip(), "start": wd.start + time_offset, "end": wd.end + time_offset}
+            for seg in segments
+            for wd in (seg.words or ())
+        ]
         print(f"✅ Whisper: {len(words)} words timestamped (offset +{time_offset:.1f}s)")
         return words
     except Exception as e:
@@ -285,21 +467,26 @@ def get_word_timestamps(audio_path, time_offset=0.0):
 # White chunk (always visible during chunk) + yellow word highlight
 # ALL CAPS, 90px, thick black stroke — no box background
 # ============================================================
+# drawtext-breaking chars + punctuation, dropped in one translate pass
+_CAPTION_STRIP = str.maketrans("", "", "\\:'\"[]{}|<>!?.,;")
+
+
 def sanitize_caption(text):
     """Strip chars that break FFmpeg drawtext parser."""
-    text = text.upper().strip()
-    text = re.sub(r"[\\:'\"\[\]{}|<>]", "", text)
-    text = re.sub(r"[!?.,;]", "", text)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
+    return " ".join(text.upper().translate(_CAPTION_STRIP).split())
+
+
+@lru_cache(maxsize=8)
+def _font(font_path, font_size):
+    """Parsed Pillow font, cached so each TTF is only loaded once per size."""
+    from PIL import ImageFont
+    return ImageFont.truetype(font_path, font_size)
 
 
 def measure_word_width(word, font_path, font_size=90):
     """Use Pillow to measure pixel width of a word."""
     try:
-        from PIL import ImageFont
-        font = ImageFont.truetype(str(font_path), font_size)
-        return font.getlength(word)
+        return _font(str(font_path), font_size).getlength(word)
     except Exception:
         # Fallback estimate: ~55px per char at 90px font size
         return len(word) * 55
@@ -307,42 +494,139 @@ def measure_word_width(word, font_path, font_size=90):
 
 def measure_space_width(font_path, font_size=90):
     try:
-        from PIL import ImageFont
-        font = ImageFont.truetype(str(font_path), font_size)
-        return font.getlength(" ")
+        return _font(str(font_path), font_size).getlength(" ")
     except Exception:
         return 28
 
 
+def _caption_font_path(font_path=None):
+    """
+    Font priority for measurement (Pillow) and rendering (FFmpeg):
+    1. Custom font passed in (Montserrat/Oswald if downloaded)
+    2. Impact — already on Windows, iconic TikTok caption font
+    3. Arial Bold — safe final fallback
+    """
+    if font_path and Path(font_path).exists() and Path(font_path).stat().st_size > 10_000:
+        return str(font_path)
+    if IMPACT_FONT.exists():
+        return str(IMPACT_FONT)
+    arial_bold = Path("C:/Windows/Fonts/arialbd.ttf")
+    if arial_bold.exists():
+        return str(arial_bold)
+    return None
+
+
+@lru_cache(maxsize=4)
+def _drawtext_font_arg(meas_font):
+    """drawtext font option for a resolved font path, escaped once and reused."""
+    # For FFmpeg drawtext: always use fontfile= (no fontstyle= — invalid option)
+    if meas_font:
+        return f"fontfile='{ffmpeg_font_path(meas_font)}'"
+    return "font=Arial"   # fontconfig last resort, no style option
+
+
+def _ass_time(t):
+    """Seconds → ASS timestamp (H:MM:SS.cc)."""
+    cs = max(0, int(round(t * 100)))
+    return f"{cs // 360000}:{cs // 6000 % 60:02d}:{cs // 100 % 60:02d}.{cs % 100:02d}"
+
+
+def _ass_color(hex_color):
+    """#RRGGBB → ASS &HBBGGRR& colour."""
+    h = hex_color.lstrip("#")
+    return f"&H{h[4:6]}{h[2:4]}{h[0:2]}&".upper()
+
+
+def build_ass_captions(word_timestamps, ass_path, font_path=None, highlight_color=None):
+    """
+    Write the TikTok karaoke captions as an .ass subtitle file and return the
+    matching `subtitles=` filter (one libass node instead of one drawtext per
+    word). Returns "" if there is nothing to render.
+
+    Same look as build_tiktok_captions: the whole chunk in white, the word
+    being spoken in the highlight colour. Each chunk is split into events at
+    the word boundaries rather than using \\k karaoke tags, since \\k leaves
+    already-sung words coloured.
+    """
+    if not word_timestamps:
+        return ""
+
+    meas_font = _caption_font_path(font_path)
+    font_name = "Arial"
+    fonts_dir = None
+    if meas_font:
+        try:
+            font_name = _font(meas_font, 112).getname()[0]
+            fonts_dir = str(Path(meas_font).parent)
+        except Exception:
+            pass
+
+    font_size  = 112
+    chunk_size = 3
+    y_pos      = int(1920 * 0.72)    # same spot as drawtext y=h*0.72
+    hl         = _ass_color(highlight_color or "#FFE600")
+
+    lines = [
+        "[Script Info]",
+        "ScriptType: v4.00+",
+        "PlayResX: 1080",
+        "PlayResY: 1920",
+        "WrapStyle: 2",
+        "ScaledBorderAndShadow: yes",
+        "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, "
+        "BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, "
+        "BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+        f"Style: Caption,{font_name},{font_size},&H00FFFFFF,&H00FFFFFF,&H00000000,"
+        f"&H00000000,0,0,0,0,100,100,0,0,1,6,0,8,0,0,{y_pos},1",
+        "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+    ]
+
+    for ci in range(0, len(word_timestamps), chunk_size):
+        chunk       = word_timestamps[ci : ci + chunk_size]
+        chunk_start = chunk[0]["start"]
+        chunk_end   = chunk[-1]["end"] + 0.1
+        words_upper = [sanitize_caption(w["word"]) for w in chunk]
+        spans       = [(w["start"], w["end"] + 0.05) for w in chunk]
+
+        cuts = sorted({chunk_start, chunk_end,
+                       *(t for span in spans for t in span if chunk_start < t < chunk_end)})
+        for a, b in zip(cuts, cuts[1:]):
+            active = None
+            for j, (ws, we) in enumerate(spans):
+                if ws <= a < we and words_upper[j]:
+                    active = j
+            text = " ".join(
+                f"{{\\1c{hl}}}{w}{{\\1c&HFFFFFF&}}" if j == active else w
+                for j, w in enumerate(words_upper) if w
+            )
+            if text:
+                lines.append(f"Dialogue: 0,{_ass_time(a)},{_ass_time(b)},Caption,,0,0,0,,{text}")
+
+    with open(ass_path, "w", encoding="utf-8") as fh:
+        fh.write("\n".join(lines) + "\n")
+
+    flt = f"subtitles=filename='{ffmpeg_font_path(ass_path)}'"
+    if fonts_dir:
+        flt += f":fontsdir='{ffmpeg_font_path(fonts_dir)}'"
+    return flt
+
+
 def build_tiktok_captions(word_timestamps, font_path=None, script_data=None, highlight_color=None):
     """
     Build TikTok karaoke caption filters.
     Returns a comma-joined drawtext filter string.
+    Fallback for ffmpeg builds without libass — see build_ass_captions.
     """
     if not word_timestamps:
         return ""
 
-    # Font priority for measurement (Pillow) and rendering (FFmpeg):
-    # 1. Custom font passed in (Montserrat/Oswald if downloaded)
-    # 2. Impact — already on Windows, iconic TikTok caption font
-    # 3. Arial Bold — safe final fallback
-    def _best_font_path():
-        if font_path and Path(font_path).exists() and Path(font_path).stat().st_size > 10_000:
-            return str(font_path)
-        if IMPACT_FONT.exists():
-            return str(IMPACT_FONT)
-        arial_bold = Path("C:/Windows/Fonts/arialbd.ttf")
-        if arial_bold.exists():
-            return str(arial_bold)
-        return None
-
-    meas_font = _best_font_path()
+    meas_font = _caption_font_path(font_path)
 
-    # For FFmpeg drawtext: always use fontfile= (no fontstyle= — invalid option)
-    if meas_font:
-        ffmpeg_font_arg = f"fontfile='{ffmpeg_font_path(meas_font)}'"
-    else:
-        ffmpeg_font_arg = "font=Arial"   # fontconfig last resort, no style option
+    ffmpeg_font_arg = _drawtext_font_arg(meas_font)
 
     font_size  = 112
     space_w    = measure_space_width(meas_font, font_size) if meas_font else 34
@@ -351,6 +635,10 @@ def build_tiktok_captions(word_timestamps, font_path=None, script_data=None, hig
     vid_w      = 1080
     y_pos      = "h*0.72"   # Viral TikTok position — upper portion of bottom half
     hl_color   = highlight_color or "#FFE600"
+    width_of   = {}     # short words ("THE", "YOU") repeat across chunks
+    # Options shared by every drawtext node; only text/colour/x/enable vary
+    common     = (f"drawtext={ffmpeg_font_arg}:fontsize={font_size}:y={y_pos}:"
+                  f"borderw=6:bordercolor=black")
 
     for ci in range(0, len(word_timestamps), chunk_size):
         chunk       = word_timestamps[ci : ci + chunk_size]
@@ -359,7 +647,11 @@ def build_tiktok_captions(word_timestamps, font_path=None, script_data=None, hig
 
         # Measure each word
         words_upper = [sanitize_caption(w["word"]) for w in chunk]
-        widths      = [measure_word_width(w, meas_font, font_size) for w in words_upper]
+        widths      = []
+        for w in words_upper:
+            if w not in width_of:
+                width_of[w] = measure_word_width(w, meas_font, font_size)
+            widths.append(width_of[w])
         total_w     = sum(widths) + space_w * max(0, len(chunk) - 1)
 
         start_x     = int((vid_w - total_w) / 2)
@@ -367,12 +659,7 @@ def build_tiktok_captions(word_timestamps, font_path=None, script_data=None, hig
 
         # ── White: full chunk visible for entire chunk duration ──
         filters.append(
-            f"drawtext={ffmpeg_font_arg}:"
-            f"text='{full_text}':"
-            f"fontcolor=white:"
-            f"fontsize={font_size}:"
-            f"x={start_x}:y={y_pos}:"
-            f"borderw=6:bordercolor=black:"
+            f"{common}:text='{full_text}':fontcolor=white:x={start_x}:"
             f"enable='between(t,{chunk_start:.3f},{chunk_end:.3f})'"
         )
 
@@ -386,12 +673,7 @@ def build_tiktok_captions(word_timestamps, font_path=None, script_data=None, hig
             w_start = word_data["start"]
             w_end   = word_data["end"] + 0.05
             filters.append(
-                f"drawtext={ffmpeg_font_arg}:"
-                f"text='{word_upper}':"
-                f"fontcolor={hl_color}:"
-                f"fontsize={font_size}:"
-                f"x={int(x)}:y={y_pos}:"
-                f"borderw=6:bordercolor=black:"
+                f"{common}:text='{word_upper}':fontcolor={hl_color}:x={int(x)}:"
                 f"enable='between(t,{w_start:.3f},{w_end:.3f})'"
             )
             x += widths[j] + space_w
@@ -402,6 +684,33 @@ def build_tiktok_captions(word_timestamps, font_path=None, script_data=None, hig
 # ============================================================
 # HOOK BACKGROUND — cinematic AI image via Pollinations.ai (free)
 # ============================================================
+# Leonardo token balance per API key, probed once per process
+_LEO_TOKENS = {}
+
+
+def _leonardo_tokens(key):
+    try:
+        chk = _HTTP.get("https://cloud.leonardo.ai/api/rest/v1/me",
+                        headers={"Authorization": f"Bearer {key}"}, timeout=10)
+        if chk.status_code != 200:
+            return 0
+        return chk.json().get("user_details", [{}])[0].get("subscriptionTokens", 0)
+    except Exception:
+        return 0
+
+
+# Words that say nothing about the subject — dropped from the Commons query
+_HOOK_FILLER = frozenset({
+    "the", "a", "an", "of", "in", "to", "is", "was", "were", "be",
+    "dark", "darkest", "shocking", "secret", "secrets", "truth", "exposed",
+    "nobody", "talks", "about", "revealed", "hidden", "real", "true",
+    "blood", "money", "contract", "never", "told", "untold", "story",
+    "what", "how", "why", "who", "this", "that", "and", "or", "but",
+    "s", "most", "ever", "you", "your", "they", "their", "his", "her",
+})
+_HOOK_STRIP = str.maketrans("", "", ".,!?:;\"'")
+
+
 def _generate_hook_background(hook_text):
     """
     Generates the best possible 1080x1920 background for the hook card.
@@ -416,17 +725,21 @@ def _generate_hook_background(hook_text):
     """
     import io, time as _time
     try:
-        from PIL import Image, ImageFilter, ImageEnhance
+        from PIL import Image, ImageFilter
     except ImportError:
         return None
 
     def _darken(img, overlay_alpha=0.55, blur=1.0, desaturate=0.3):
         """Apply dark cinematic treatment: desaturate → overlay → blur."""
-        img = img.resize((1080, 1920), Image.LANCZOS)
+        import numpy as np
+        arr = np.asarray(img.resize((1080, 1920), Image.LANCZOS), dtype=np.float32)
+        # Desaturate (same luma weights as ImageEnhance.Color) and blend toward
+        # black in one arithmetic pass instead of two full-image Pillow passes.
         if desaturate < 1.0:
-            img = ImageEnhance.Color(img).enhance(desaturate)
-        overlay = Image.new("RGB", (1080, 1920), (0, 0, 0))
-        img = Image.blend(img, overlay, alpha=overlay_alpha)
+            gray = arr @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+            arr  = arr * desaturate + gray[..., None] * (1.0 - desaturate)
+        arr *= 1.0 - overlay_alpha
+        img = Image.fromarray(np.clip(arr, 0, 255).astype(np.uint8), "RGB")
         if blur > 0:
             img = img.filter(ImageFilter.GaussianBlur(radius=blur))
         return img
@@ -451,74 +764,60 @@ def _generate_hook_background(hook_text):
 
         # Extract meaningful search keywords from hook text
         # Remove possessives, filler words, ALL CAPS → clean noun query
-        _HOOK_FILLER = {
-            "the", "a", "an", "of", "in", "to", "is", "was", "were", "be",
-            "dark", "darkest", "shocking", "secret", "secrets", "truth", "exposed",
-            "nobody", "talks", "about", "revealed", "hidden", "real", "true",
-            "blood", "money", "contract", "never", "told", "untold", "story",
-            "what", "how", "why", "who", "this", "that", "and", "or", "but",
-            "s", "most", "ever", "you", "your", "they", "their", "his", "her",
-        }
-        clean_words = []
-        for w in hook_text.replace("'S", "").replace("'S", "").split():
-            w_clean = w.strip(".,!?\"'").lower()
-            if w_clean and w_clean not in _HOOK_FILLER and len(w_clean) > 2:
-                clean_words.append(w_clean.capitalize())
+        clean_words = [
+            w.capitalize()
+            for w in hook_text.upper().replace("'S", "").replace("’S", "")
+                              .lower().translate(_HOOK_STRIP).split()
+            if len(w) > 2 and w not in _HOOK_FILLER
+        ]
         search_query = " ".join(clean_words[:4]) if clean_words else hook_text[:40]
 
-        commons_resp = requests.get(
+        # One roundtrip: generator=search + prop=imageinfo returns the
+        # candidate files together with their URLs and sizes.
+        commons_resp = _HTTP.get(
             "https://commons.wikimedia.org/w/api.php",
             params={
-                "action":      "query",
-                "list":        "search",
-                "srsearch":    search_query,     # cleaned story keywords
-                "srnamespace": 6,                # namespace 6 = File (images)
-                "srlimit":     20,
-                "format":      "json",
+                "action":       "query",
+                "generator":    "search",
+                "gsrsearch":    search_query,    # cleaned story keywords
+                "gsrnamespace": 6,               # namespace 6 = File (images)
+                "gsrlimit":     20,
+                "prop":         "imageinfo",
+                "iiprop":       "url|size",
+                "format":       "json",
             },
             timeout=10,
-            headers={"User-Agent": "DarkMindBot/1.0"},
         )
         if commons_resp.status_code == 200:
-            results = commons_resp.json().get("query", {}).get("search", [])
-            random.shuffle(results)            # vary which image we pick each run
-            for item in results:
-                title = item.get("title", "")  # e.g. "File:Tesla_lab.jpg"
+            pages = list(commons_resp.json().get("query", {}).get("pages", {}).values())
+            random.shuffle(pages)              # vary which image we pick each run
+            for pg in pages:
+                title = pg.get("title", "")    # e.g. "File:Tesla_lab.jpg"
                 if not _is_good_image(title):
                     continue
-                # Get the actual image URL via imageinfo
-                info_resp = requests.get(
-                    "https://commons.wikimedia.org/w/api.php",
-                    params={
-                        "action": "query",
-                        "titles": title,
-                        "prop":   "imageinfo",
-                        "iiprop": "url|size",
-                        "format": "json",
-                    },
-                    timeout=10,
-                    headers={"User-Agent": "DarkMindBot/1.0"},
-                )
-                if info_resp.status_code != 200:
+                info = (pg.get("imageinfo") or [{}])[0]
+                img_url = info.get("url", "")
+                width   = info.get("width",  0)
+                height  = info.get("height", 0)
+                # Skip tiny images (less than 300px on either side)
+                if width < 300 or height < 300:
                     continue
-                pages = info_resp.json().get("query", {}).get("pages", {})
-                for pg in pages.values():
-                    info = pg.get("imageinfo", [{}])[0]
-                    img_url = info.get("url", "")
-                    width   = info.get("width",  0)
-                    height  = info.get("height", 0)
-                    # Skip tiny images (less than 300px on either side)
-                    if width < 300 or height < 300:
+                if not _is_good_image(img_url):
+                    continue
+                # Decode straight off the response; draft() lets the JPEG
+                # decoder scale down by 2/4/8 while decoding large originals.
+                with _HTTP.get(img_url, timeout=20, stream=True) as img_resp:
+                    if img_resp.status_code != 200:
                         continue
-                    if not _is_good_image(img_url):
+                    if int(img_resp.headers.get("Content-Length") or 15_001) <= 15_000:
                         continue
-                    img_resp = requests.get(img_url, timeout=20,
-                                            headers={"User-Agent": "DarkMindBot/1.0"})
-                    if img_resp.status_code == 200 and len(img_resp.content) > 15_000:
-                        img = Image.open(io.BytesIO(img_resp.content)).convert("RGB")
-                        img = _darken(img, overlay_alpha=0.60, blur=1.2, desaturate=0.35)
-                        print(f"  Hook background: Wikimedia Commons — {title[5:45]}")
-                        return img
+                    img_resp.raw.decode_content = True
+                    img = Image.open(img_resp.raw)
+                    img.draft("RGB", (1080, 1920))
+                    img = img.convert("RGB")
+                img = _darken(img, overlay_alpha=0.60, blur=1.2, desaturate=0.35)
+                print(f"  Hook background: Wikimedia Commons — {title[5:45]}")
+                return img
     except Exception as e:
         print(f"  Wikimedia Commons hook: {e.__class__.__name__}")
 
@@ -529,11 +828,22 @@ def _generate_hook_background(hook_text):
         os.getenv("LEONARDO_API_KEY_3"),
     ] if k]
 
+    # One budget for the whole tier (not per key) so Picsum stays reachable
+    # well inside make_hook_clip's 90s wait
+    leo_deadline = _time.monotonic() + 45
+
+    def _left(cap):
+        """Request timeout: at most cap, never past the tier deadline."""
+        return max(1, min(cap, leo_deadline - _time.monotonic()))
+
     for key in _leo_keys:
+        if _time.monotonic() >= leo_deadline:
+            print("  Leonardo hook: time budget spent — moving on")
+            break
         try:
-            chk    = requests.get("https://cloud.leonardo.ai/api/rest/v1/me",
-                                  headers={"Authorization": f"Bearer {key}"}, timeout=10)
-            tokens = chk.json().get("user_details",[{}])[0].get("subscriptionTokens",0) if chk.status_code==200 else 0
+            if key not in _LEO_TOKENS:
+                _LEO_TOKENS[key] = _leonardo_tokens(key)
+            tokens = _LEO_TOKENS[key]
             if tokens < 5:
                 continue
 
@@ -546,31 +856,39 @@ def _generate_hook_background(hook_text):
                 "8K, vertical 9:16, anamorphic lens flare, subtle film grain, "
                 "shallow depth of field, no text, no words, no watermarks"
             )
-            resp = requests.post(
+            resp = _HTTP.post(
                 "https://cloud.leonardo.ai/api/rest/v1/generations",
                 headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
                 json={"prompt": prompt,
                       "negative_prompt": "bright colors, cheerful, cartoon, text, watermark, blurry",
                       "width": 576, "height": 1024, "num_images": 1,
                       "guidance_scale": 8, "num_inference_steps": 20},
-                timeout=30,
+                timeout=_left(30),
             )
             if resp.status_code != 200:
+                # Only a dead key or an empty balance disables the key for the
+                # rest of the process — 429 / 5xx are transient
+                if resp.status_code in (401, 402) or (resp.status_code == 400 and any(
+                        w in resp.text.lower() for w in ("not enough", "insufficient", "credit"))):
+                    _LEO_TOKENS[key] = 0
                 continue
             gen_id = resp.json().get("sdGenerationJob", {}).get("generationId")
             if not gen_id:
                 continue
 
             print(f"  Hook background: Leonardo AI generating ({tokens} tokens)...")
-            for _ in range(12):
-                _time.sleep(5)
-                poll = requests.get(
+            # Poll with backoff (2s → 8s) until the tier's deadline
+            delay = 2
+            while _time.monotonic() + delay < leo_deadline:
+                _time.sleep(delay)
+                delay = min(delay * 2, 8)
+                poll = _HTTP.get(
                     f"https://cloud.leonardo.ai/api/rest/v1/generations/{gen_id}",
-                    headers={"Authorization": f"Bearer {key}"}, timeout=20)
+                    headers={"Authorization": f"Bearer {key}"}, timeout=_left(20))
                 if poll.status_code == 200:
                     imgs = poll.json().get("generations_by_pk", {}).get("generated_images", [])
                     if imgs:
-                        img_resp = requests.get(imgs[0]["url"], timeout=30)
+                        img_resp = _HTTP.get(imgs[0]["url"], timeout=_left(30))
                         if img_resp.status_code == 200:
                             img = Image.open(io.BytesIO(img_resp.content)).convert("RGB")
                             img = _darken(img, overlay_alpha=0.45, blur=0.8, desaturate=0.8)
@@ -583,9 +901,9 @@ def _generate_hook_background(hook_text):
     # ── Tier 3: Picsum Photos — beautiful real photo, always available ────
     try:
         seed = sum(ord(c) for c in hook_text) % 1000
-        r    = requests.get(f"https://picsum.photos/seed/{seed}/1080/1920",
-                            timeout=20, headers={"User-Agent": "Mozilla/5.0"},
-                            allow_redirects=True)
+        r    = _HTTP.get(f"https://picsum.photos/seed/{seed}/1080/1920",
+                         timeout=20, headers={"User-Agent": "Mozilla/5.0"},
+                         allow_redirects=True)
         r.raise_for_status()
         img = Image.open(io.BytesIO(r.content)).convert("RGB")
         img = _darken(img, overlay_alpha=0.65, blur=1.5, desaturate=0.25)
@@ -595,21 +913,27 @@ def _generate_hook_background(hook_text):
         print(f"  Picsum failed ({e.__class__.__name__})")
 
     # ── Tier 4: PIL gradient — zero network, always works ────────────────
-    img    = Image.new("RGB", (1080, 1920))
-    px     = img.load()
-    for y in range(1920):
-        t = y / 1920
-        for x in range(1080):
-            px[x, y] = (int(5 + 10*(1-t)), int(5 + 15*(1-t)), int(20 + 25*(1-t)))
-    return img
+    # Built as one (H, W, 3) array rather than ~2M per-pixel writes.
+    import numpy as np
+    inv  = 1 - np.arange(1920, dtype=np.float32)[:, None] / 1920
+    rows = np.concatenate((5 + 10*inv, 5 + 15*inv, 20 + 25*inv), axis=1).astype(np.uint8)
+    arr  = np.broadcast_to(rows[:, None, :], (1920, 1080, 3))
+    return Image.fromarray(np.ascontiguousarray(arr), "RGB")
 
 
 # ============================================================
 # HOOK CLIP — 1.8s cinematic card with hook_text in Anton font
 # ============================================================
-def make_hook_clip(hook_text, duration=1.8, output_dir=None):
+# Network-bound hook background + music fetch and CPU-bound Whisper run
+# side by side
+_bg_executor = ThreadPoolExecutor(max_workers=3)
+
+
+def make_hook_clip(hook_text, duration=1.8, output_dir=None, background=None):
     """
     Creates a 1.8s black card MP4 with hook_text rendered via Pillow.
+    background: optional Future for _generate_hook_background(hook_text),
+    started earlier so the fetch overlaps other work.
     Returns path to hook_clip.mp4 or None on failure.
     """
     if not hook_text:
@@ -617,14 +941,21 @@ def make_hook_clip(hook_text, duration=1.8, output_dir=None):
 
     out_dir  = Path(output_dir) if output_dir else TEMP_DIR
     out_dir.mkdir(exist_ok=True)
-    png_path = str(out_dir / "hook_card.png")
     mp4_path = str(out_dir / "hook_clip.mp4")
 
     try:
+        import io
         from PIL import Image, ImageDraw, ImageFont
 
         # ── Generate cinematic background via Pollinations.ai (free, no key) ──
-        img = _generate_hook_background(hook_text)
+        if background is not None:
+            try:
+                img = background.result(timeout=90)
+            except FutureTimeout:
+                print("  Hook background: still fetching after 90s — using black card")
+                img = None
+        else:
+            img = _generate_hook_background(hook_text)
         if img is None:
             img = Image.new("RGB", (1080, 1920), color=(0, 0, 0))
 
@@ -632,26 +963,28 @@ def make_hook_clip(hook_text, duration=1.8, output_dir=None):
 
         # Load Anton if available, else fall back to Arial Bold
         if FONT_ANTON.exists():
-            font = ImageFont.truetype(str(FONT_ANTON), 110)
+            font = _font(str(FONT_ANTON), 110)
         else:
             try:
-                font = ImageFont.truetype("C:/Windows/Fonts/arialbd.ttf", 110)
+                font = _font("C:/Windows/Fonts/arialbd.ttf", 110)
             except Exception:
                 font = ImageFont.load_default()
 
         text = hook_text.upper()
 
-        # Word-wrap at ~900px wide
+        # Word-wrap at ~900px wide — measure each word once, accumulate widths
         words   = text.split()
+        space_w = font.getlength(" ")
         lines   = []
         current = []
+        cur_w   = 0.0
         for word in words:
-            test_line = " ".join(current + [word])
-            bbox = draw.textbbox((0, 0), test_line, font=font)
-            if bbox[2] > 940 and current:
+            word_w = font.getlength(word)
+            if current and cur_w + space_w + word_w > 940:
                 lines.append(" ".join(current))
-                current = [word]
+                current, cur_w = [word], word_w
             else:
+                cur_w += (space_w if current else 0) + word_w
                 current.append(word)
         if current:
             lines.append(" ".join(current))
@@ -661,38 +994,39 @@ def make_hook_clip(hook_text, duration=1.8, output_dir=None):
         y_start = (1920 - total_h) // 2 - 60
 
         for i, line in enumerate(lines):
-            bbox = draw.textbbox((0, 0), line, font=font)
-            lw   = bbox[2] - bbox[0]
-            x    = (1080 - lw) // 2
-            y    = y_start + i * line_h
-            # Thick black outline
-            for dx, dy in [(-4,-4),(4,-4),(-4,4),(4,4),(0,-5),(0,5),(-5,0),(5,0)]:
-                draw.text((x+dx, y+dy), line, font=font, fill=(0, 0, 0))
-            # White fill
-            draw.text((x, y), line, font=font, fill=(255, 255, 255))
-
-        img.save(png_path)
+            x = int(1080 - font.getlength(line)) // 2
+            y = y_start + i * line_h
+            # White fill with thick black outline, rendered in one pass
+            draw.text((x, y), line, font=font, fill=(255, 255, 255),
+                      stroke_width=5, stroke_fill=(0, 0, 0))
+
+        buf = io.BytesIO()
+        img.save(buf, format="PNG", compress_level=1)
+        png_bytes = buf.getvalue()
 
     except Exception as e:
         print(f"⚠️  Hook card Pillow error: {e}")
         return None
 
-    # Convert PNG to video — use -framerate + -frames:v for Linux ffmpeg compatibility
+    # Pipe the still straight into ffmpeg (no temp PNG) and repeat the one
+    # decoded frame with the loop filter; the card never changes, so x264
+    # gets -tune stillimage and the fastest preset.
     frames = max(1, int(duration * 30))
     success = run_ffmpeg(
         [
             "ffmpeg", "-y",
-            "-framerate", "30",
-            "-loop", "1", "-i", png_path,
+            "-f", "image2pipe", "-framerate", "30", "-i", "pipe:0",
+            "-vf", "loop=loop=-1:size=1,scale=1080:1920:force_original_aspect_ratio=disable",
             "-c:v", "libx264",
+            "-preset", "ultrafast", "-tune", "stillimage",
             "-frames:v", str(frames),
             "-r", "30",
             "-pix_fmt", "yuv420p",
-            "-vf", "scale=1080:1920:force_original_aspect_ratio=disable",
             "-an",
             mp4_path,
         ],
-        "Hook clip"
+        "Hook clip",
+        stdin_data=png_bytes,
     )
     return mp4_path if success and os.path.exists(mp4_path) else None
 
@@ -700,143 +1034,335 @@ def make_hook_clip(hook_text, duration=1.8, output_dir=None):
 # ============================================================
 # MUSIC — Pixabay API first, CDN fallback
 # ============================================================
+# Music providers get their own pooled session: browser headers (some CDNs
+# refuse bot UAs) and enough connections for the concurrent probes.
+# TLS verification stays on; only the ccMixter download calls pass verify=False.
+_MUSIC_HTTP = requests.Session()
+_MUSIC_HTTP.headers.update({
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36",
+    "Accept":     "audio/mpeg, audio/*, */*",
+})
+for _scheme in ("http://", "https://"):
+    _MUSIC_HTTP.mount(_scheme, requests.adapters.HTTPAdapter(pool_connections=20, pool_maxsize=40))
+
+
+# MPEG audio frame tables, indexed by the header's version / layer bits
+# (version 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5; layer 3 = I, 2 = II, 1 = III)
+_MP3_BITRATES = {
+    (3, 3): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (3, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (3, 1): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 3): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 1): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _mp3_frame(head, i):
+    """
+    Parse the MPEG audio frame header at head[i]. Returns
+    (version, layer, sample_rate, frame_length), or None if it isn't one.
+    Free-format frames (bitrate index 0) have no computable length and
+    count as None too.
+    """
+    if i + 4 > len(head) or head[i] != 0xFF or (head[i + 1] & 0xE0) != 0xE0:
+        return None
+    version = (head[i + 1] >> 3) & 0x03
+    layer   = (head[i + 1] >> 1) & 0x03
+    br_idx  = head[i + 2] >> 4
+    sr_idx  = (head[i + 2] >> 2) & 0x03
+    if version == 1 or layer == 0 or br_idx in (0, 15) or sr_idx == 3:
+        return None
+    bitrate = _MP3_BITRATES[(3 if version == 3 else 2, layer)][br_idx] * 1000
+    srate   = _MP3_SAMPLE_RATES[version][sr_idx]
+    padding = (head[i + 2] >> 1) & 0x01
+    if layer == 3:
+        length = (12 * bitrate // srate + padding) * 4
+    elif layer == 1 and version != 3:
+        length = 72 * bitrate // srate + padding
+    else:
+        length = 144 * bitrate // srate + padding
+    return version, layer, srate, length
+
+
+def _looks_like_mp3(head):
+    """
+    Sniff the first bytes of a file for MP3 audio: a frame header right at
+    the start (or right after the ID3v2 tag, skipped by its syncsafe size),
+    followed by a matching second frame at the computed frame length.
+
+    Returns True (MP3), False (definitely not — e.g. an HTML error page or
+    a JPEG), or None when the buffer is too short to tell (a large ID3 tag
+    with cover art, free-format frames) and ffprobe should decide.
+    """
+    off = 0
+    if head.startswith(b"ID3"):
+        if len(head) < 10:
+            return None
+        size = (head[6] & 0x7F) << 21 | (head[7] & 0x7F) << 14 | (head[8] & 0x7F) << 7 | (head[9] & 0x7F)
+        off  = 10 + size + (10 if head[5] & 0x10 else 0)   # + footer, if flagged
+    if off + 4 > len(head):
+        return None
+    first = _mp3_frame(head, off)
+    if first is None:
+        # Bitrate index 0 is a legal (free-format) frame ffprobe can judge
+        free = head[off] == 0xFF and (head[off + 1] & 0xE0) == 0xE0 and head[off + 2] >> 4 == 0
+        return None if free else False
+    nxt = off + first[3]
+    if nxt + 4 > len(head):
+        return None
+    second = _mp3_frame(head, nxt)
+    return second is not None and second[:3] == first[:3]
+
+
+_audio_check_cache = {}   # (path, mtime_ns, size) → bool
+
+
 def _is_valid_audio(file_path):
-    """Return True only if ffprobe finds at least one audio stream."""
+    """
+    Return True only if the file holds audio. MP3 frames are sniffed from
+    the first 4KB; anything else (or an inconclusive sniff) goes to ffprobe.
+    """
     try:
-        result = subprocess.run(
-            ["ffprobe", "-v", "error", "-select_streams", "a",
-             "-show_entries", "stream=codec_type",
-             "-of", "default=noprint_wrappers=1:nokey=1",
-             str(file_path)],
-            capture_output=True, text=True,
-        )
-        return "audio" in result.stdout
+        st  = os.stat(file_path)
+        key = (os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+        if key in _audio_check_cache:
+            return _audio_check_cache[key]
+        with open(file_path, "rb") as fh:
+            head = fh.read(4096)
+        if _looks_like_mp3(head) is True:
+            ok = True
+        else:
+            result = subprocess.run(
+                ["ffprobe", "-v", "error", "-select_streams", "a",
+                 "-show_entries", "stream=codec_type",
+                 "-of", "default=noprint_wrappers=1:nokey=1",
+                 str(file_path)],
+                capture_output=True, text=True,
+            )
+            ok = "audio" in result.stdout
+        _audio_check_cache[key] = ok
+        return ok
     except Exception:
         return False
 
 
-def fetch_music_track(mood, output_path="temp/music.mp3"):
-    global _used_music_urls
-    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+def _probe_audio_url(url, verify=True):
+    """
+    Fetch just the first 4KB of a candidate and check it is a real MP3.
+    Definite failures (gone, too small, not audio) are remembered as bad;
+    timeouts and connection errors are not.
+    """
+    try:
+        with _MUSIC_HTTP.get(url, headers={"Range": "bytes=0-4095"},
+                             timeout=10, stream=True, verify=verify) as r:
+            if r.status_code in (403, 404, 410):
+                _bad_music_urls[url] = time.time()
+            if r.status_code not in (200, 206):
+                return False
+            size = r.headers.get("Content-Range", "").rpartition("/")[2] or r.headers.get("Content-Length")
+            if (size and size.isdigit() and int(size) <= 30_000) \
+                    or _looks_like_mp3(r.raw.read(4096, decode_content=True)) is False:
+                _bad_music_urls[url] = time.time()
+                return False
+            return True
+    except Exception:
+        return False
+
+
+def _live_audio_urls(urls, verify=True):
+    """
+    Probe candidate URLs 6 at a time and yield the ones that answer with MP3
+    bytes, fastest first — dead links and HTML error pages cost one short
+    probe each instead of a full 35s download attempt.
+    """
+    pool = ThreadPoolExecutor(max_workers=6)
+    try:
+        futures = {pool.submit(_probe_audio_url, u, verify): u
+                   for u in urls if u not in _bad_music_urls}
+        for fut in as_completed(futures):
+            if fut.result():
+                yield futures[fut]
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+_VALID_MOODS = frozenset({"cinematic", "tense", "dark_ambient", "phonk", "lofi"})
+_MOOD_SPLIT  = re.compile(r"[\s,/]+")
+
+# Mood → provider search terms
+_CCMIXTER_TAGS = {
+    "cinematic":    "cinematic",
+    "tense":        "dark",
+    "dark_ambient": "ambient",
+    "phonk":        "hip+hop",
+    "lofi":         "chill",
+}
+_ARCHIVE_QUERIES = {
+    "cinematic":   "dark cinematic orchestral",
+    "tense":       "suspense tense thriller",
+    "dark_ambient":"dark ambient instrumental",
+    "phonk":       "dark trap instrumental",
+    "lofi":        "lo-fi dark chill instrumental",
+}
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0.0.0 Safari/537.36",
-        "Accept":     "audio/mpeg, audio/*, */*",
-    }
+# Query ccMixter and Archive.org side by side (first valid track wins).
+# MUSIC_PARALLEL_TIERS=false restores the one-provider-at-a-time fallback
+# for bandwidth-constrained runs.
+MUSIC_PARALLEL_TIERS = os.getenv("MUSIC_PARALLEL_TIERS", "true").lower() == "true"
 
-    JAMENDO_TAGS = {
-        "cinematic":   "epic cinematic orchestral",
-        "tense":       "thriller suspense dark",
-        "dark_ambient":"dark ambient mysterious",
-        "phonk":       "dark hip-hop trap",
-        "lofi":        "lofi ambient chill",
-    }
 
-    def _download(url, label):
+def fetch_music_track(mood, output_path="temp/music.mp3", run_key=None):
+    """
+    run_key: identifies the video being assembled (assemble_video passes the
+    voiceover path). A track already on disk is only reused when it was
+    fetched for the same run and mood, i.e. a re-assembly of the same video.
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+
+    marker = Path(output_path).with_suffix(".mood")
+    stamp  = f"{mood}\n{run_key}"
+    try:
+        if (run_key and os.path.exists(output_path)
+                and marker.read_text(encoding="utf-8") == stamp
+                and _is_valid_audio(output_path)):
+            print(f"✅ Music: reusing {output_path} ({mood})")
+            return output_path
+    except OSError:
+        pass
+
+    found = threading.Event()     # set once any tier has landed a track
+    lock  = threading.Lock()
+
+    def _download(url, label, verify=True):
+        # Stream straight to disk (no in-memory copy of the MP3) and only
+        # move it over output_path once it checks out as audio. Each thread
+        # gets its own .part file since both tiers may download at once.
+        tmp_path = f"{output_path}.{threading.get_ident()}.part"
         try:
-            r = requests.get(url, headers=headers, timeout=35, stream=True)
-            if r.status_code == 200:
-                content = b"".join(r.iter_content(65536))
-                if len(content) > 30_000:
-                    with open(output_path, "wb") as f:
-                        f.write(content)
-                    if _is_valid_audio(output_path):
-                        _used_music_urls.add(url)
-                        print(f"✅ Music {label}: {len(content)//1024}KB")
+            with _MUSIC_HTTP.get(url, timeout=35, stream=True, verify=verify) as r:
+                if r.status_code != 200:
+                    return False
+                # Chunked copy so a download that loses the race stops right
+                # away (closing the response) instead of running to the end
+                with open(tmp_path, "wb") as f:
+                    for chunk in r.iter_content(chunk_size=65536):
+                        if found.is_set():
+                            return False
+                        f.write(chunk)
+            size = os.path.getsize(tmp_path)
+            if size > 30_000 and _is_valid_audio(tmp_path):
+                with lock:
+                    if found.is_set():        # the other tier won the race
                         return True
+                    os.replace(tmp_path, output_path)
+                    marker.write_text(stamp, encoding="utf-8")
+                    found.set()
+                _used_music_urls[url] = time.time()
+                # The scheduler keeps one process alive for days — save now
+                # so a kill or crash doesn't forget this session's tracks
+                _save_music_cache()
+                print(f"✅ Music {label}: {size//1024}KB")
+                return True
+            _bad_music_urls[url] = time.time()
         except Exception:
             pass
+        finally:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
         return False
 
     # ── Tier 1: ccMixter (CC-BY — safe for YouTube/TikTok) ──────────────────
-    CCMIXTER_TAGS = {
-        "cinematic":    "cinematic",
-        "tense":        "dark",
-        "dark_ambient": "ambient",
-        "phonk":        "hip+hop",
-        "lofi":         "chill",
-    }
-    ccm_tag = CCMIXTER_TAGS.get(mood, "dark")
-    try:
-        resp = requests.get(
-            "http://ccmixter.org/api/query",
-            params={"tags": ccm_tag, "limit": 20, "format": "json", "type": "track"},
-            timeout=15,
-        )
-        if resp.status_code == 200:
-            tracks = resp.json()
-            random.shuffle(tracks)
-            for track in tracks:
-                for f in track.get("files", []):
-                    # Use the download_url field directly — most reliable
-                    audio_url = f.get("download_url", "")
-                    if not audio_url or not audio_url.endswith(".mp3"):
-                        continue
-                    if audio_url in _used_music_urls:
-                        continue
-                    label = f"ccMixter/{track.get('upload_name','')[:25]}"
-                    # verify=False needed for ccMixter SSL cert on Windows Python 3.14
+    def _tier_ccmixter():
+        ccm_tag = _CCMIXTER_TAGS.get(mood, "dark")
+        try:
+            resp = _MUSIC_HTTP.get(
+                "http://ccmixter.org/api/query",
+                params={"tags": ccm_tag, "limit": 20, "format": "json", "type": "track"},
+                timeout=15,
+            )
+            if resp.status_code == 200:
+                tracks = resp.json()
+                random.shuffle(tracks)
+                labels = {}
+                for track in tracks:
+                    for f in track.get("files", []):
+                        # Use the download_url field directly — most reliable
+                        audio_url = f.get("download_url", "")
+                        if not audio_url or not audio_url.endswith(".mp3"):
+                            continue
+                        if audio_url in _used_music_urls:
+                            continue
+                        labels.setdefault(audio_url, f"ccMixter/{track.get('upload_name','')[:25]}")
+                # verify=False needed for ccMixter SSL cert on Windows Python 3.14
+                for audio_url in _live_audio_urls(list(labels), verify=False):
+                    if found.is_set() or _download(audio_url, labels[audio_url], verify=False):
+                        return True
+        except Exception as e:
+            print(f"   ⚠️  ccMixter music error: {e}")
+        return False
+
+    # ── Tier 2: Archive.org (CC music, stable) ───────────────
+    def _tier_archive():
+        archive_q = _ARCHIVE_QUERIES.get(mood, "dark cinematic instrumental")
+        try:
+            search_resp = _MUSIC_HTTP.get(
+                "https://archive.org/advancedsearch.php",
+                params={
+                    "q":      f"({archive_q}) AND mediatype:audio AND licenseurl:*creative*",
+                    "output": "json",
+                    "rows":   15,
+                    "fields": "identifier",
+                },
+                timeout=12,
+            )
+            if search_resp.status_code == 200:
+                docs = search_resp.json().get("response", {}).get("docs", [])
+                random.shuffle(docs)
+                iids = [doc["identifier"] for doc in docs[:6] if doc.get("identifier")]
+
+                # The per-item metadata lookups are independent — run them together
+                def _item_files(iid):
                     try:
-                        r = requests.get(audio_url, headers=headers, timeout=35,
-                                         stream=True, verify=False)
-                        if r.status_code == 200:
-                            content = b"".join(r.iter_content(65536))
-                            if len(content) > 30_000:
-                                with open(output_path, "wb") as f_out:
-                                    f_out.write(content)
-                                if _is_valid_audio(output_path):
-                                    _used_music_urls.add(audio_url)
-                                    print(f"✅ Music {label}: {len(content)//1024}KB")
-                                    return output_path
+                        return _MUSIC_HTTP.get(
+                            f"https://archive.org/metadata/{iid}/files", timeout=8
+                        ).json().get("result", [])
                     except Exception:
-                        continue
-    except Exception as e:
-        print(f"   ⚠️  ccMixter music error: {e}")
+                        return []
 
-    # ── Tier 2: Archive.org (CC music, stable) ───────────────
-    ARCHIVE_QUERIES = {
-        "cinematic":   "dark cinematic orchestral",
-        "tense":       "suspense tense thriller",
-        "dark_ambient":"dark ambient instrumental",
-        "phonk":       "dark trap instrumental",
-        "lofi":        "lo-fi dark chill instrumental",
-    }
-    archive_q = ARCHIVE_QUERIES.get(mood, "dark cinematic instrumental")
-    try:
-        search_resp = requests.get(
-            "https://archive.org/advancedsearch.php",
-            params={
-                "q":      f"({archive_q}) AND mediatype:audio AND licenseurl:*creative*",
-                "output": "json",
-                "rows":   15,
-                "fields": "identifier",
-            },
-            timeout=12,
-        )
-        if search_resp.status_code == 200:
-            docs = search_resp.json().get("response", {}).get("docs", [])
-            random.shuffle(docs)
-            for doc in docs[:6]:
-                iid = doc.get("identifier", "")
-                if not iid:
-                    continue
-                try:
-                    meta = requests.get(
-                        f"https://archive.org/metadata/{iid}/files", timeout=8
-                    ).json().get("result", [])
+                with ThreadPoolExecutor(max_workers=6) as pool:
+                    metas = list(pool.map(_item_files, iids))
+
+                for iid, meta in zip(iids, metas):
                     mp3s = [f for f in meta if f.get("format") in ("MP3", "VBR MP3")
                             and int(f.get("length", 0) or 0) > 30]
                     random.shuffle(mp3s)
                     for mp3 in mp3s[:2]:
                         dl_url = f"https://archive.org/download/{iid}/{mp3['name']}"
-                        if dl_url in _used_music_urls:
+                        if dl_url in _used_music_urls or dl_url in _bad_music_urls:
                             continue
-                        if _download(dl_url, f"archive.org/{iid[:20]}"):
-                            return output_path
-                except Exception:
-                    continue
-    except Exception as e:
-        print(f"   ⚠️  Archive.org music error: {e}")
+                        if found.is_set() or _download(dl_url, f"archive.org/{iid[:20]}"):
+                            return True
+        except Exception as e:
+            print(f"   ⚠️  Archive.org music error: {e}")
+        return False
+
+    if MUSIC_PARALLEL_TIERS:
+        # Search both providers at once; first valid track wins and the
+        # other tier abandons its in-flight download at the next chunk.
+        pool = ThreadPoolExecutor(max_workers=2)
+        try:
+            for fut in as_completed([pool.submit(_tier_ccmixter), pool.submit(_tier_archive)]):
+                if fut.result():
+                    return output_path
+        finally:
+            found.set()
+            pool.shutdown(wait=False)
+    elif _tier_ccmixter() or _tier_archive():
+        return output_path
 
     # ── Tier 3: CDN fallback (disabled — Pixabay tracks trigger Content ID) ─
     # MUSIC_CDN is intentionally empty; video runs music-free rather than risk
@@ -848,6 +1374,11 @@ def fetch_music_track(mood, output_path="temp/music.mp3"):
 # ============================================================
 # KEN BURNS WITH BEAT-DRIVEN CAMERA MOTION
 # ============================================================
+# Per-visual renders run concurrently (see assemble_video step 7); cap each
+# ffmpeg's encoder threads so the parallel jobs don't oversubscribe the CPU.
+RENDER_THREADS = 2
+
+
 def apply_ken_burns(image_path, duration, index, camera_motion=None):
     output = str(TEMP_DIR / f"kb_{index}.mp4")
     fps    = 30
@@ -868,7 +1399,8 @@ def apply_ken_burns(image_path, duration, index, camera_motion=None):
             f"fps={fps}"
         ),
         "-frames:v", str(frames),
-        "-c:v", "libx264", "-preset", "fast", "-crf", "20",
+        "-c:v", "libx264", *INTERMEDIATE_X264, "-crf", "20",
+        "-threads", str(RENDER_THREADS),
         "-pix_fmt", "yuv420p", "-an",
         output,
     ]
@@ -891,7 +1423,8 @@ def process_video_clip(clip_path, duration, index):
             "fps=30"                   # CFR output — fps filter at end avoids vsync conflict
         ),
         "-frames:v", str(frames),     # exact frame count (replaces -t to avoid vsync issues)
-        "-c:v", "libx264", "-preset", "fast", "-crf", "20",
+        "-c:v", "libx264", *INTERMEDIATE_X264, "-crf", "20",
+        "-threads", str(RENDER_THREADS),
         "-pix_fmt", "yuv420p",
         "-an",
         output,
@@ -925,12 +1458,52 @@ def build_visual_list(images_dir="images", clips_dir="clips", format_key="story_
 # ============================================================
 # XFADE CONCAT — beat-aware transitions between every clip
 # ============================================================
-def concat_with_xfade(clip_paths, durations, script_data=None):
+def build_xfade_graph(clip_paths, durations, script_data=None, labels=None):
     """
-    Concatenate clips with smooth xfade transitions driven by beat pace.
+    Build the xfade filter chain for clip_paths (one ffmpeg input each).
     fast beats  → hard snap (0.08s fadeblack/wipe)
     medium beats → dynamic slide (0.12s)
     slow beats  → smooth fade (0.15s)
+    labels: stream label per clip (default "[i:v]", the raw inputs).
+    Returns (filters, out_label); a single clip needs no filters and the
+    output label is just its input stream.
+    """
+    n = len(clip_paths)
+    labels = labels or [f"[{i}:v]" for i in range(n)]
+    if n == 1:
+        return [], labels[0]
+
+    beats    = script_data.get("beats", []) if script_data else []
+    # beats[0] corresponds to the FIRST beat clip (index may be offset by hook card)
+    # We match by position — first clip in list = first beat reference
+
+    # Per-transition pace → duration/type, then running offsets in one pass;
+    # the loop below only formats precomputed numbers.
+    # Beat index: hook card has no beat, so offset by 1 if present
+    paces   = [beats[min(i, len(beats) - 1)].get("pace", "medium") if beats else "medium"
+               for i in range(n - 1)]
+    tdurs   = [XFADE_DUR.get(p, 0.1) for p in paces]
+    transes = [random.choice(XFADE_BY_PACE.get(p, ["fade"])) for p in paces]
+    offsets = accumulate(d - t for d, t in zip(durations, tdurs))
+
+    filters    = []
+    prev_label = labels[0]
+    for i, (tdur, trans, offset) in enumerate(zip(tdurs, transes, offsets)):
+        out_label = f"[xv{i+1}]" if i < n - 2 else "[vout]"
+        filters.append(
+            f"{prev_label}{labels[i+1]}xfade=transition={trans}:"
+            f"duration={tdur:.3f}:offset={max(0.01, offset):.3f}{out_label}"
+        )
+        prev_label = f"[xv{i+1}]"
+
+    return filters, "[vout]"
+
+
+def concat_with_xfade(clip_paths, durations, script_data=None):
+    """
+    Concatenate clips with smooth xfade transitions driven by beat pace.
+    assemble_video fuses this graph with the grade + captions instead
+    (see grade_and_caption); this standalone version writes concat.mp4.
     """
     output = str(TEMP_DIR / "concat.mp4")
 
@@ -940,43 +1513,112 @@ def concat_with_xfade(clip_paths, durations, script_data=None):
         shutil.copy(clip_paths[0], output)
         return output
 
-    beats    = script_data.get("beats", []) if script_data else []
-    # beats[0] corresponds to the FIRST beat clip (index may be offset by hook card)
-    # We match by position — first clip in list = first beat reference
-    n = len(clip_paths)
-
+    filters, out_label = build_xfade_graph(clip_paths, durations, script_data)
     cmd = ["ffmpeg", "-y"]
     for p in clip_paths:
         cmd += ["-i", p]
+    cmd += [
+        "-filter_complex", ";".join(filters),
+        "-map", out_label,
+        "-c:v", "libx264", *INTERMEDIATE_X264, "-crf", "23",
+        "-r", "30", "-pix_fmt", "yuv420p", "-an", output,
+    ]
+    return output if run_ffmpeg(cmd, "Concat with xfade transitions") else None
+
+
+# ============================================================
+# SINGLE-PASS RENDER — every visual as a filter-graph input
+# ============================================================
+# Opt-in: render all Ken Burns / clip beats inside the same ffmpeg command as
+# the xfade + grade + captions, instead of one ffmpeg (and one intermediate
+# MP4) per visual. One filter graph runs mostly on one core, so on machines
+# with many cores the parallel per-visual path (default) can still be faster.
+SINGLE_PASS_RENDER = os.getenv("SINGLE_PASS_RENDER", "false").lower() == "true"
 
-    filters        = []
-    prev_label     = "[0:v]"
-    cum_offset     = 0.0
+# Normalise every branch so xfade sees identical size/fps/format/timebase
+_STREAM_NORM = "setsar=1,format=yuv420p,settb=AVTB"
 
-    for i in range(n - 1):
-        # Beat index: hook card has no beat, so offset by 1 if present
-        beat_idx = i if i < len(beats) else len(beats) - 1
-        pace     = beats[beat_idx].get("pace", "medium") if beats else "medium"
 
-        tdur     = XFADE_DUR.get(pace, 0.1)
-        trans    = random.choice(XFADE_BY_PACE.get(pace, ["fade"]))
+def build_visual_graph(visuals, durations, script_data, lead_clip=None):
+    """
+    ffmpeg inputs + per-visual filter chains equivalent to apply_ken_burns /
+    process_video_clip, for feeding build_xfade_graph directly.
+    lead_clip: an already-rendered MP4 (the hook card) placed first.
+    Returns (inputs, filters, labels).
+    """
+    inputs, filters, labels = [], [], []
 
-        cum_offset += durations[i] - tdur
-        out_label   = f"[xv{i+1}]" if i < n - 2 else "[vout]"
+    if lead_clip:
+        inputs += ["-i", os.path.abspath(lead_clip)]
+        filters.append(f"[0:v]fps=30,{_STREAM_NORM}[s0]")
+        labels.append("[s0]")
 
+    for vis, dur in zip(visuals, durations):
+        idx    = len(labels)
+        frames = max(1, int(dur * 30))
+        if vis["type"] == "clip":
+            inputs += ["-stream_loop", "-1", "-i", os.path.abspath(vis["path"])]
+            chain = ("scale=1080:1920:force_original_aspect_ratio=increase,"
+                     "crop=1080:1920,fps=30")
+        else:
+            motion = get_beat_camera_motion(vis, script_data)
+            effect = (MOTION_MAP[motion] if motion in MOTION_MAP
+                      else random.choice(MOTION_LIST)).format(d=frames)
+            # Single still frame in: zoompan emits exactly d frames from it
+            inputs += ["-i", os.path.abspath(vis["path"])]
+            chain = ("scale=1440:2560:force_original_aspect_ratio=increase,"
+                     f"crop=1440:2560,{effect},fps=30")
         filters.append(
-            f"{prev_label}[{i+1}:v]xfade=transition={trans}:"
-            f"duration={tdur:.3f}:offset={max(0.01, cum_offset):.3f}{out_label}"
+            f"[{idx}:v]{chain},trim=end_frame={frames},setpts=PTS-STARTPTS,"
+            f"{_STREAM_NORM}[s{idx}]"
         )
-        prev_label = f"[xv{i+1}]"
+        labels.append(f"[s{idx}]")
 
-    cmd += [
-        "-filter_complex", ";".join(filters),
-        "-map", "[vout]",
-        "-c:v", "libx264", "-preset", "fast", "-crf", "23",
-        "-r", "30", "-pix_fmt", "yuv420p", "-an", output,
-    ]
-    return output if run_ffmpeg(cmd, "Concat with xfade transitions") else None
+    return inputs, filters, labels
+
+
+# ============================================================
+# GRADE + CAPTIONS — fused onto the xfade graph, one encode
+# ============================================================
+GRADE_FILTER = "eq=contrast=1.15:brightness=-0.05:saturation=0.85,curves=preset=darker,vignette=PI/4"
+
+
+def input_args(paths):
+    """["-i", path, ...] for a list of already-rendered media files."""
+    return [arg for p in paths for arg in ("-i", os.path.abspath(p))]
+
+
+def grade_and_caption(inputs, filters, out_label, caption_passes, output):
+    """
+    Run the ffmpeg inputs (see input_args) through `filters` (ending at
+    out_label), the dark colour grade and a caption burn-in as ONE ffmpeg
+    command — a single decode and encode instead of concat.mp4 →
+    graded.mp4 → captioned.mp4.
+
+    caption_passes: [(description, build_fn)], tried in order until one
+    renders; build_fn returns the caption filter ("" for none).
+    The graph goes through a script file (lessons L005).
+    """
+    script = os.path.abspath(str(TEMP_DIR / "caption_filter.txt"))
+    cmd    = ["ffmpeg", "-y", *inputs]
+
+    for description, build in caption_passes:
+        caption = build()
+        chain   = GRADE_FILTER + (f",{caption}" if caption else "")
+        with open(script, "w", encoding="utf-8") as fh:
+            fh.write(";".join(filters + [f"{out_label}{chain}[vfinal]"]))
+        ok = run_ffmpeg(
+            cmd + [
+                "-filter_complex_script", script,
+                "-map", "[vfinal]",
+                "-c:v", "libx264", *INTERMEDIATE_X264, "-crf", "23",
+                "-r", "30", "-pix_fmt", "yuv420p", "-an", output,
+            ],
+            description,
+        )
+        if ok:
+            return True
+    return False
 
 
 # ============================================================
@@ -993,7 +1635,7 @@ def assemble_video(
     if script_data is None:
         script_data = {}
 
-    TEMP_DIR.mkdir(exist_ok=True)
+    TEMP_DIR.mkdir(parents=True, exist_ok=True)
     OUTPUT_DIR.mkdir(exist_ok=True)
     ensure_fonts()
 
@@ -1012,22 +1654,28 @@ def assemble_video(
     print(f"⏱️  Voiceover: {vo_duration:.2f}s")
 
     # ── 2. Hook clip — visual backdrop while voice speaks hook ──
+    # Kick off the hook background fetch, Whisper and the music search
+    # together; the network waits overlap transcription and the visual
+    # renders instead of preceding them.
     HOOK_DURATION = 1.8
     hook_text     = script_data.get("hook_text", "")
-    hook_clip     = make_hook_clip(hook_text, HOOK_DURATION, str(TEMP_DIR)) if hook_text else None
+    bg_future     = _bg_executor.submit(_generate_hook_background, hook_text) if hook_text else None
+    ts_future     = _bg_executor.submit(get_word_timestamps, voiceover_path, 0.0)
+
+    # ── 4. Music (result only needed for the final mix) ───
+    _raw_mood    = script_data.get("suggested_music", "cinematic")
+    mood = _raw_mood if _raw_mood in _VALID_MOODS else next(
+        (c for c in _MOOD_SPLIT.split(_raw_mood) if c in _VALID_MOODS), "cinematic"
+    )
+    music_future  = _bg_executor.submit(fetch_music_track, mood, str(TEMP_DIR / "music.mp3"),
+                                        os.path.abspath(voiceover_path))
+    hook_clip     = make_hook_clip(hook_text, HOOK_DURATION, str(TEMP_DIR),
+                                   background=bg_future) if hook_text else None
     if hook_clip:
         print(f"🪝 Hook card: {HOOK_DURATION}s visual — voice starts at t=0 speaking '{hook_text}'")
 
     # ── 3. Whisper word timestamps — no offset, voice at t=0 ──
-    word_timestamps = get_word_timestamps(voiceover_path, time_offset=0.0)
-
-    # ── 4. Music ──────────────────────────────────────────
-    _raw_mood    = script_data.get("suggested_music", "cinematic")
-    _valid_moods = {"cinematic", "tense", "dark_ambient", "phonk", "lofi"}
-    mood = _raw_mood if _raw_mood in _valid_moods else next(
-        (c for c in re.split(r"[\s,/]+", _raw_mood) if c in _valid_moods), "cinematic"
-    )
-    music_path = fetch_music_track(mood, str(TEMP_DIR / "music.mp3"))
+    word_timestamps = ts_future.result()
 
     # ── 5. Build / normalise visual list ──────────────────
     if images is None:
@@ -1057,114 +1705,130 @@ def assemble_video(
     durations = calculate_beat_durations(visuals, script_data, max(visual_duration, vo_duration / len(visuals)))
     print(f"⚡ Beat durations: {[f'{d:.1f}s' for d in durations]}")
 
-    # ── 7. Process each visual with beat camera motion ────
-    processed = []
-    for i, vis in enumerate(visuals):
-        dur    = durations[i] if i < len(durations) else visual_duration / len(visuals)
-        motion = get_beat_camera_motion(vis, script_data)
-
-        if vis["type"] == "clip":
-            out = process_video_clip(vis["path"], dur, i + 1)
-        else:
-            out = apply_ken_burns(vis["path"], dur, i + 1, camera_motion=motion)
-        if out:
-            processed.append(out)
-
-    if not processed:
-        print("❌ No visuals processed successfully")
-        return None
-
-    # ── 7b. Prepend hook card (visual only, voice already speaking) ──
-    if hook_clip:
-        processed      = [hook_clip] + processed
-        hook_durations = [HOOK_DURATION] + durations
-    else:
-        hook_durations = durations
-
-    # ── 8. Concat with xfade transitions ──────────────────
-    concat_path = concat_with_xfade(processed, hook_durations, script_data)
-    if not concat_path:
-        # Fallback to simple concat if xfade fails
-        print("⚠️  xfade failed — falling back to simple concat")
-        concat_file = str(TEMP_DIR / "concat.txt")
-        with open(concat_file, "w") as f:
-            for p in processed:
-                f.write(f"file '{os.path.abspath(p)}'\n")
-        concat_path = str(TEMP_DIR / "concat.mp4")
-        ok = run_ffmpeg(
-            ["ffmpeg", "-y", "-f", "concat", "-safe", "0",
-             "-i", concat_file,
-             "-c:v", "libx264", "-preset", "fast", "-crf", "23",
-             "-r", "30", "-an", concat_path],
-            "Simple concat fallback",
-        )
-        if not ok:
-            return None
-
-    # ── 9. Dark color grade ───────────────────────────────
-    graded_path = str(TEMP_DIR / "graded.mp4")
-    run_ffmpeg(
-        ["ffmpeg", "-y", "-i", concat_path,
-         "-vf", "eq=contrast=1.15:brightness=-0.05:saturation=0.85,curves=preset=darker,vignette=PI/4",
-         "-c:v", "libx264", "-preset", "fast", "-crf", "23", "-an", graded_path],
-        "Dark color grade",
-    )
-
-    # ── 10. TikTok karaoke captions ───────────────────────
-    captioned_path  = os.path.abspath(str(TEMP_DIR / "captioned.mp4"))
-    caption_filter  = ""
+    # Caption burn-in variants, tried in order by grade_and_caption
+    captioned_path = os.path.abspath(str(TEMP_DIR / "captioned.mp4"))
+    caption_font   = str(FONT_MONTSERRAT) if FONT_MONTSERRAT.exists() else None
+    caption_passes = []
     if word_timestamps:
-        caption_filter = build_tiktok_captions(
-            word_timestamps,
-            font_path=str(FONT_MONTSERRAT) if FONT_MONTSERRAT.exists() else None,
-            script_data=script_data,
-            highlight_color=highlight_color,
-        )
-
-    if caption_filter:
-        filter_script = os.path.abspath(str(TEMP_DIR / "caption_filter.txt"))
-        with open(filter_script, "w", encoding="utf-8") as fh:
-            fh.write(caption_filter)
-
-        ok = run_ffmpeg(
-            ["ffmpeg", "-y",
-             "-i", os.path.abspath(graded_path),
-             "-filter_script:v", filter_script,
-             "-c:v", "libx264", "-preset", "fast", "-crf", "23", "-an",
-             captioned_path],
-            "TikTok karaoke captions",
-        )
-        if not ok:
-            print("⚠️  Custom font failed — retrying with Arial")
-            fallback_filter = build_tiktok_captions(
-                word_timestamps, font_path=None, script_data=script_data,
-                highlight_color=highlight_color,
-            )
-            with open(filter_script, "w", encoding="utf-8") as fh:
-                fh.write(fallback_filter)
-            ok2 = run_ffmpeg(
-                ["ffmpeg", "-y",
-                 "-i", os.path.abspath(graded_path),
-                 "-filter_script:v", filter_script,
-                 "-c:v", "libx264", "-preset", "fast", "-crf", "23", "-an",
-                 captioned_path],
-                "TikTok captions (Arial fallback)",
-            )
-            if not ok2:
-                shutil.copy(graded_path, captioned_path)
+        drawtext_built = []
+
+        def _drawtext_captions():
+            if not drawtext_built:
+                drawtext_built.append(build_tiktok_captions(
+                    word_timestamps, font_path=caption_font, script_data=script_data,
+                    highlight_color=highlight_color,
+                ))
+            return drawtext_built[0]
+
+        caption_passes = [
+            ("Concat + grade + TikTok karaoke captions", lambda: build_ass_captions(
+                word_timestamps, os.path.abspath(str(TEMP_DIR / "captions.ass")),
+                font_path=caption_font, highlight_color=highlight_color,
+            )),
+            # ffmpeg without libass — fall back to the drawtext chain
+            ("Concat + grade + captions (drawtext)", _drawtext_captions),
+        ]
+        # The Arial fallback only differs in the font option — swap it into
+        # the chain already built (same word layout) instead of re-measuring
+        # every word. Skipped when both resolve to the same font.
+        primary_font  = _drawtext_font_arg(_caption_font_path(caption_font))
+        fallback_font = _drawtext_font_arg(_caption_font_path(None))
+        if fallback_font != primary_font:
+            caption_passes.append(("Concat + grade + captions (Arial fallback)",
+                                   lambda: _drawtext_captions().replace(primary_font, fallback_font)))
     else:
         print("⚠️  No caption data — skipping captions")
-        shutil.copy(graded_path, captioned_path)
+    caption_passes.append(("Concat + grade (no captions)", lambda: ""))
+
+    # ── 7–10 (opt-in). Whole video in a single ffmpeg command ──
+    if SINGLE_PASS_RENDER:
+        n_vis = min(len(visuals), len(durations))
+        inputs, filters, labels = build_visual_graph(
+            visuals[:n_vis], durations[:n_vis], script_data, lead_clip=hook_clip)
+        seq_durations = ([HOOK_DURATION] if hook_clip else []) + durations[:n_vis]
+        xfade, out_label = build_xfade_graph(labels, seq_durations, script_data, labels=labels)
+        if grade_and_caption(inputs, filters + xfade, out_label, caption_passes, captioned_path):
+            caption_passes = None     # done — skip the per-visual path below
+        else:
+            print("⚠️  Single-pass render failed — falling back to per-visual renders")
+
+    if caption_passes is not None:
+        # ── 7. Process each visual with beat camera motion ────
+        # Each render is its own ffmpeg process, so run them side by side
+        # (2 encoder threads apiece) and keep the results in visual order.
+        def _render(i):
+            vis = visuals[i]
+            dur = durations[i] if i < len(durations) else visual_duration / len(visuals)
+            if vis["type"] == "clip":
+                return process_video_clip(vis["path"], dur, i + 1)
+            motion = get_beat_camera_motion(vis, script_data)
+            return apply_ken_burns(vis["path"], dur, i + 1, camera_motion=motion)
+
+        workers = max(1, min(len(visuals), (os.cpu_count() or 2) // RENDER_THREADS))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            processed = [out for out in pool.map(_render, range(len(visuals))) if out]
+
+        if not processed:
+            print("❌ No visuals processed successfully")
+            return None
 
-    # ── 11. Final mix: video + voiceover (t=0) + music ───
-    # Voice starts at t=0 — hook text is SPOKEN, not silent
-    voice_filter = "[1:a]volume=1.0[voice]"
+        # ── 7b. Prepend hook card (visual only, voice already speaking) ──
+        if hook_clip:
+            processed      = [hook_clip] + processed
+            hook_durations = [HOOK_DURATION] + durations
+        else:
+            hook_durations = durations
+
+        # ── 8–10. xfade concat + dark grade + captions, one ffmpeg pass ──
+        filters, out_label = build_xfade_graph(processed, hook_durations, script_data)
+        if not grade_and_caption(input_args(processed), filters, out_label,
+                                 caption_passes, captioned_path):
+            # Fallback to simple concat if xfade fails
+            print("⚠️  xfade failed — falling back to simple concat")
+            concat_file = str(TEMP_DIR / "concat.txt")
+            with open(concat_file, "w") as f:
+                for p in processed:
+                    f.write(f"file '{os.path.abspath(p)}'\n")
+            concat_path = str(TEMP_DIR / "concat.mp4")
+            # Every input was just encoded by this module (H.264, 1080x1920,
+            # 30fps, yuv420p), so the concat demuxer can stream-copy them; its
+            # per-file h264_mp4toannexb keeps the hook card's own SPS/PPS intact.
+            ok = run_ffmpeg(
+                ["ffmpeg", "-y", "-f", "concat", "-safe", "0",
+                 "-i", concat_file,
+                 "-c", "copy", "-an", concat_path],
+                "Simple concat fallback (stream copy)",
+            ) or run_ffmpeg(
+                ["ffmpeg", "-y", "-f", "concat", "-safe", "0",
+                 "-i", concat_file,
+                 "-c:v", "libx264", *INTERMEDIATE_X264, "-crf", "23",
+                 "-r", "30", "-an", concat_path],
+                "Simple concat fallback",
+            )
+            if not ok:
+                return None
+            if not grade_and_caption(input_args([concat_path]), [], "[0:v]",
+                                     caption_passes, captioned_path):
+                # concat.mp4 is scratch — rename it rather than copying bytes
+                os.replace(concat_path, captioned_path)
+
+    # ── 11. Final mix: video + voiceover (t=0) + music, sped up ───
+    # Voice starts at t=0 — hook text is SPOKEN, not silent.
+    # The 1.3x playback speed is applied here (setpts/atempo) rather than in
+    # a second full re-encode of the finished file.
+    PLAYBACK_SPEED = 1.3
+    music_path     = music_future.result()
+    final_duration = total_duration / PLAYBACK_SPEED
+    voice_filter   = f"[1:a]volume=1.0,atempo={PLAYBACK_SPEED}[voice]"
+    video_filter   = (f"[0:v]trim=duration={total_duration:.3f},"
+                      f"setpts=(PTS-STARTPTS)/{PLAYBACK_SPEED}[v]")
 
     if music_path and os.path.exists(music_path):
         filter_complex = (
-            f"[0:v]trim=duration={total_duration:.3f},setpts=PTS-STARTPTS[v];"
+            f"{video_filter};"
             f"{voice_filter};"
-            f"[2:a]volume=0.08,atrim=duration={total_duration:.3f},asetpts=PTS-STARTPTS[music];"
+            f"[2:a]volume=0.08,atrim=duration={total_duration:.3f},asetpts=PTS-STARTPTS,"
+            f"atempo={PLAYBACK_SPEED}[music];"
             f"[voice][music]amix=inputs=2:duration=first[audio]"
         )
         final_cmd = [
@@ -1176,12 +1840,12 @@ def assemble_video(
             "-map", "[v]", "-map", "[audio]",
             "-c:v", "libx264", "-preset", "fast", "-crf", "22",
             "-c:a", "aac", "-b:a", "192k",
-            "-t", str(total_duration),
+            "-t", f"{final_duration:.3f}",
             output_path,
         ]
     else:
         filter_complex = (
-            f"[0:v]trim=duration={total_duration:.3f},setpts=PTS-STARTPTS[v];"
+            f"{video_filter};"
             f"{voice_filter}"
         )
         final_cmd = [
@@ -1192,39 +1856,11 @@ def assemble_video(
             "-map", "[v]", "-map", "[voice]",
             "-c:v", "libx264", "-preset", "fast", "-crf", "22",
             "-c:a", "aac", "-b:a", "192k",
-            "-t", str(total_duration),
+            "-t", f"{final_duration:.3f}",
             output_path,
         ]
 
-    run_ffmpeg(final_cmd, "Final mix (video + voice + music)")
-
-    # ── Speed up final video ──────────────────────────────
-    PLAYBACK_SPEED = 1.3
-    if os.path.exists(output_path):
-        sped_path = output_path.replace(".mp4", "_fast.mp4")
-        atempo    = PLAYBACK_SPEED
-        speed_ok  = run_ffmpeg(
-            [
-                "ffmpeg", "-y", "-i", output_path,
-                "-filter_complex",
-                f"[0:v]setpts=PTS/{atempo}[v];[0:a]atempo={atempo}[a]",
-                "-map", "[v]", "-map", "[a]",
-                "-c:v", "libx264", "-preset", "fast", "-crf", "22",
-                "-c:a", "aac", "-b:a", "192k",
-                sped_path,
-            ],
-            f"Speed up {atempo}x",
-        )
-        if speed_ok and os.path.exists(sped_path):
-            # Windows can hold a file lock briefly after FFmpeg exits — retry a few times
-            for _attempt in range(5):
-                try:
-                    if os.path.exists(output_path):
-                        os.remove(output_path)
-                    shutil.move(sped_path, output_path)
-                    break
-                except PermissionError:
-                    time.sleep(1)
+    run_ffmpeg(final_cmd, f"Final mix (video + voice + music, {PLAYBACK_SPEED}x)")
 
     # ── Report ────────────────────────────────────────────
     if os.path.exists(output_path):
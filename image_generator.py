@@ -6,10 +6,20 @@ Dark Mind — Image & Clip Generator
 - Pexels video → Pixabay video (clips)
 """
 import os
+import re
+import hashlib
 import sys
 import time
 import random
+import shutil
+import threading
+import orjson
 import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from functools import lru_cache
+from itertools import islice
+from urllib3.util.retry import Retry
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -30,6 +40,41 @@ PIXABAY_API_KEY = os.getenv("PIXABAY_API_KEY")
 
 current_key_index = 0
 
+# Beats fetched concurrently in generate_all_images (network-bound)
+VISUAL_WORKERS = 6
+
+# Per-host token buckets — (requests per second, burst) — so concurrent
+# beats stay under each API's rate limit without fixed sleeps
+_RATE_LIMITS = {"leonardo": (1.0, 2), "pexels": (3.0, 6), "pixabay": (3.0, 6)}
+_buckets     = {host: [burst, time.monotonic()] for host, (_, burst) in _RATE_LIMITS.items()}
+_bucket_lock = threading.Lock()
+
+
+def _throttle(host):
+    """Block until one more API request to host fits its token bucket."""
+    rate, burst = _RATE_LIMITS[host]
+    while True:
+        with _bucket_lock:
+            tokens, last = _buckets[host]
+            now    = time.monotonic()
+            tokens = min(burst, tokens + (now - last) * rate)
+            if tokens >= 1:
+                _buckets[host] = [tokens - 1, now]
+                return
+            _buckets[host] = [tokens, now]
+            wait = (1 - tokens) / rate
+        time.sleep(wait)
+
+# One pooled session for every Leonardo / Pexels / Pixabay / Commons call —
+# keep-alive instead of a fresh TCP+TLS handshake per request. Retry only
+# covers idempotent methods, so a generation POST is never sent twice.
+_HTTP = requests.Session()
+_HTTP.mount("https://", requests.adapters.HTTPAdapter(
+    pool_connections=8, pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5,
+                      status_forcelist=[502, 503, 504], raise_on_status=False),
+))
+
 # Track used video keywords per run — prevents duplicate Pexels searches
 _used_keywords: set = set()
 
@@ -40,6 +85,41 @@ _KW_VARIATIONS = [
     "exterior", "detail shot",
 ]
 
+# Abstract words stock libraries have no footage of
+STOCK_BLOCKLIST = frozenset({
+    "psychological", "psychology", "abstract", "invisible", "concept",
+    "emotion", "emotions", "metaphor", "symbolic", "theory", "mental",
+    "cognitive", "subconscious", "aversion", "bias", "bubble", "fomo",
+    "algorithm", "influence", "manipulation", "trick", "anchoring",
+    "persuasion", "heuristic", "effect", "principle", "technique",
+})
+
+# Well-known proper nouns stock libraries have NO footage of
+PERSON_NAME_BLOCKLIST = frozenset({
+    "elon", "musk", "zuckerberg", "mark", "buffett", "warren", "bezos",
+    "gates", "bill", "jobs", "steve", "cialdini", "robert", "freud",
+    "trump", "obama", "biden", "powell", "munger", "dalio", "ray",
+    "soros", "george", "tesla", "facebook", "meta", "google", "apple",
+    "amazon", "microsoft", "twitter", "tiktok", "instagram", "youtube",
+})
+
+_KW_BLOCK = STOCK_BLOCKLIST | PERSON_NAME_BLOCKLIST
+
+
+def _sanitize_keywords(kws):
+    """Strip abstract words and proper names that Pexels can't search for."""
+    if not kws:
+        return kws
+    filtered = []
+    for w in kws.split():
+        if w.lower().rstrip("s,.") in _KW_BLOCK:
+            continue
+        # Skip likely proper nouns (capitalized, >2 chars, not the first word)
+        if filtered and w[0].isupper() and len(w) > 2 and not w.isupper():
+            continue
+        filtered.append(w)
+    return " ".join(filtered) if filtered else kws
+
 # ============================================================
 # STYLE PRESETS
 # ============================================================
@@ -67,11 +147,11 @@ def adaptive_darken(image_path):
     Treatment strength adapts to the image's current brightness.
     """
     try:
-        from PIL import Image, ImageEnhance
+        from PIL import Image, ImageEnhance, ImageStat
         img = Image.open(image_path).convert("RGB")
 
-        # Measure average brightness (0-255)
-        brightness = sum(img.convert("L").getdata()) / (img.width * img.height)
+        # Measure average brightness (0-255) — computed in C from the histogram
+        brightness = ImageStat.Stat(img.convert("L")).mean[0]
 
         if brightness > 180:          # Very bright → heavy treatment
             contrast_val  = 1.4
@@ -96,6 +176,114 @@ def adaptive_darken(image_path):
         return image_path
 
 
+# ============================================================
+# STOCK SEARCH CACHE — Pexels/Pixabay search responses, 10 min TTL
+# ============================================================
+# (url, params) -> (json, expires_at). Gaming-clip queries and keyword
+# variants recur across beats and runs; only the media download repeats.
+# Search responses by (url, params) → (data, expires), least recently used
+# first. Bounded because keys include the randomised page number and the
+# scheduler keeps one process alive for days.
+_SEARCH_CACHE = OrderedDict()
+_SEARCH_TTL   = 600
+_SEARCH_MAX   = 256
+_search_lock  = threading.Lock()
+
+
+def _json(resp):
+    """Decode a response body with orjson (faster than requests' stdlib json)."""
+    return orjson.loads(resp.content)
+
+
+_WORD_RE = re.compile(r"\S+")
+
+
+@lru_cache(maxsize=512)
+def _first_words(text, n):
+    """First n whitespace-separated words of text, without splitting all of it."""
+    return tuple(m.group() for m in islice(_WORD_RE.finditer(text), n))
+
+
+def _search_json(host, url, params, headers=None):
+    """GET a search endpoint through the TTL cache. Returns None on non-200."""
+    key = (url, tuple(sorted(params.items())))
+    with _search_lock:
+        hit = _SEARCH_CACHE.get(key)
+        if hit and time.monotonic() < hit[1]:
+            _SEARCH_CACHE.move_to_end(key)
+            return hit[0]
+        if hit:
+            del _SEARCH_CACHE[key]     # expired
+    _throttle(host)
+    resp = _HTTP.get(url, headers=headers, params=params, timeout=30)
+    if resp.status_code != 200:
+        return None
+    data = _json(resp)
+    now = time.monotonic()
+    with _search_lock:
+        _SEARCH_CACHE[key] = (data, now + _SEARCH_TTL)
+        _SEARCH_CACHE.move_to_end(key)
+        # Drop expired entries, then trim the least recently used to the cap
+        for k in [k for k, (_, exp) in _SEARCH_CACHE.items() if exp <= now]:
+            del _SEARCH_CACHE[k]
+        while len(_SEARCH_CACHE) > _SEARCH_MAX:
+            _SEARCH_CACHE.popitem(last=False)
+    return data
+
+
+def _save_stream(url, out, timeout=30, chunk=1 << 18):
+    """Stream url straight into out in large chunks — no in-memory copy. True on 200."""
+    with _HTTP.get(url, timeout=timeout, stream=True) as r:
+        if r.status_code != 200:
+            return False
+        r.raw.decode_content = True
+        with open(out, "wb") as f:
+            shutil.copyfileobj(r.raw, f, length=chunk)
+    return True
+
+
+# Losing _first_of calls still in flight — drained before a run returns
+_stragglers     = []
+_straggler_lock = threading.Lock()
+
+
+def _first_of(*calls):
+    """
+    Run the zero-argument calls side by side (e.g. a Pexels and a Pixabay
+    fetch) and return the first truthy result. A slower call that also
+    succeeds has its output file removed.
+    """
+    pool    = ThreadPoolExecutor(max_workers=len(calls))
+    futures = [pool.submit(c) for c in calls]
+    pool.shutdown(wait=False)
+    with _straggler_lock:
+        _stragglers.extend(futures)
+    winner  = None
+    for fut in as_completed(futures):
+        if fut.exception() is None and fut.result():
+            winner = fut.result()
+            break
+
+    def _discard(fut):
+        if fut.exception() is None and fut.result() and fut.result() != winner:
+            try:
+                os.remove(fut.result())
+            except OSError:
+                pass
+
+    for fut in futures:
+        fut.add_done_callback(_discard)
+    return winner
+
+
+def _drain_stragglers():
+    """Block until every losing _first_of call has finished and cleaned up."""
+    with _straggler_lock:
+        pending = _stragglers[:]
+        _stragglers.clear()
+    wait(pending)
+
+
 # ============================================================
 # LEONARDO KEY MANAGEMENT
 # ============================================================
@@ -113,20 +301,152 @@ def rotate_key():
     print(f"  🔄 Rotating to Leonardo key {idx}")
 
 
+@lru_cache(maxsize=16)
+def _leo_headers(key, json_body=False):
+    """Leonardo request headers, built once per key (requests copies, never mutates them)."""
+    headers = {"Authorization": f"Bearer {key}"}
+    if json_body:
+        headers["Content-Type"] = "application/json"
+    return headers
+
+
+# Token balance per key, persisted across runs so back-to-back pipeline runs
+# don't re-read /v1/me for every key. Stored under a short hash of the key
+# (never the secret itself) as {"tokens": n, "expires": unix time};
+# generations debit locally without moving the expiry, so a busy key is
+# still re-read from /v1/me once the TTL is up.
+BALANCE_FILE  = Path(__file__).parent / ".leonardo_balances.json"
+_TOKEN_TTL    = 600
+_GEN_COST     = 5       # tokens one 576x1024 generation costs
+_balance_lock = threading.Lock()
+
+
+@lru_cache(maxsize=16)
+def _balance_id(key):
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+def _load_balances():
+    try:
+        return orjson.loads(BALANCE_FILE.read_bytes())
+    except (OSError, orjson.JSONDecodeError):
+        return {}
+
+
+_TOKEN_CACHE = _load_balances()
+
+
+def _save_balances():
+    """Write _TOKEN_CACHE atomically. Caller holds _balance_lock."""
+    tmp = BALANCE_FILE.with_suffix(".tmp")
+    try:
+        tmp.write_bytes(orjson.dumps(_TOKEN_CACHE))
+        os.replace(tmp, BALANCE_FILE)
+    except OSError as e:
+        print(f"  ⚠️  Could not save Leonardo balances: {e}")
+
+
+def _set_balance(key, tokens):
+    """Record a fresh balance for key (or with tokens=None, forget it) and save."""
+    with _balance_lock:
+        if tokens is None:
+            _TOKEN_CACHE.pop(_balance_id(key), None)
+        else:
+            _TOKEN_CACHE[_balance_id(key)] = {"tokens": tokens, "expires": time.time() + _TOKEN_TTL}
+        _save_balances()
+
+
+def _debit_balance(key, cost=_GEN_COST):
+    """Subtract cost from key's cached balance, keeping its expiry. Returns what's left."""
+    with _balance_lock:
+        entry = _TOKEN_CACHE.get(_balance_id(key))
+        if entry is None:
+            return None
+        entry["tokens"] = max(0, entry.get("tokens", 0) - cost)
+        _save_balances()
+        return entry["tokens"]
+
+
 def check_leonardo_tokens(key):
+    cached = _TOKEN_CACHE.get(_balance_id(key))
+    if cached and time.time() < cached.get("expires", 0):
+        return cached.get("tokens", 0)
     try:
-        r = requests.get(
+        _throttle("leonardo")
+        r = _HTTP.get(
             "https://cloud.leonardo.ai/api/rest/v1/me",
-            headers={"Authorization": f"Bearer {key}"},
+            headers=_leo_headers(key),
             timeout=10,
         )
         if r.status_code == 200:
-            return r.json().get("user_details", [{}])[0].get("subscriptionTokens", 0)
+            tokens = _json(r).get("user_details", [{}])[0].get("subscriptionTokens", 0)
+            _set_balance(key, tokens)
+            return tokens
         return 0
     except Exception:
         return 0
 
 
+# ============================================================
+# LEONARDO GENERATION POLLER — one background thread checks every
+# outstanding generation instead of each beat sleeping and polling on its
+# own. Each generation keeps its own jittered backoff: first check after
+# 1.5s, then 1.6x per attempt up to 8s, plus up to 30% jitter.
+# ============================================================
+_PENDING      = {}      # gen_id -> {"key", "done" Event, "holder" [url], "due", "delay"}
+_pending_lock = threading.Lock()
+_poller       = None
+_POLL_FIRST   = 1.5
+_POLL_MAX     = 8
+_POLL_TICK    = 0.5     # longest the poller sleeps, so new jobs are picked up
+
+
+def _poll_generations():
+    while True:
+        now = time.monotonic()
+        with _pending_lock:
+            jobs = [(gen_id, job) for gen_id, job in _PENDING.items()
+                    if job["due"] <= now and not job["done"].is_set()]
+            next_due = min((job["due"] for job in _PENDING.values()), default=now + _POLL_TICK)
+        if not jobs:
+            time.sleep(min(max(next_due - now, 0.05), _POLL_TICK))
+            continue
+        for gen_id, job in jobs:
+            try:
+                _throttle("leonardo")
+                poll = _HTTP.get(
+                    f"https://cloud.leonardo.ai/api/rest/v1/generations/{gen_id}",
+                    headers=_leo_headers(job["key"]),
+                    timeout=30,
+                )
+                if poll.status_code == 200:
+                    imgs = _json(poll).get("generations_by_pk", {}).get("generated_images", [])
+                    if imgs:
+                        job["holder"].append(imgs[0]["url"])
+                        job["done"].set()
+                        continue
+            except Exception:
+                pass
+            job["delay"] = min(job["delay"] * 1.6, _POLL_MAX)
+            job["due"]   = time.monotonic() + job["delay"] * random.uniform(1.0, 1.3)
+
+
+def _await_generation(gen_id, key, timeout=60):
+    """Block until the shared poller sees gen_id's first image. Returns its URL or None."""
+    global _poller
+    done, holder = threading.Event(), []
+    with _pending_lock:
+        _PENDING[gen_id] = {"key": key, "done": done, "holder": holder,
+                            "due": time.monotonic() + _POLL_FIRST, "delay": _POLL_FIRST}
+        if _poller is None:
+            _poller = threading.Thread(target=_poll_generations, daemon=True)
+            _poller.start()
+    done.wait(timeout)
+    with _pending_lock:
+        _PENDING.pop(gen_id, None)
+    return holder[0] if holder else None
+
+
 # ============================================================
 # LEONARDO AI GENERATION
 # ============================================================
@@ -138,7 +458,7 @@ def generate_leonardo(prompt, style, index, output_dir):
             return None
 
         tokens = check_leonardo_tokens(key)
-        if tokens < 5:
+        if tokens < _GEN_COST:
             print(f"  ⚠️  Key {(current_key_index % len(LEONARDO_KEYS))+1} low ({tokens} tokens) — rotating")
             rotate_key()
             continue
@@ -147,13 +467,11 @@ def generate_leonardo(prompt, style, index, output_dir):
             style_suffix = STYLE_PROMPTS.get(style, STYLE_PROMPTS["dark_cinematic"])
             full_prompt  = f"{prompt}, {style_suffix}"
 
-            resp = requests.post(
+            _throttle("leonardo")
+            resp = _HTTP.post(
                 "https://cloud.leonardo.ai/api/rest/v1/generations",
-                headers={
-                    "Authorization":  f"Bearer {key}",
-                    "Content-Type":   "application/json",
-                },
-                json={
+                headers=_leo_headers(key, json_body=True),
+                data=orjson.dumps({
                     "prompt":           full_prompt,
                     "negative_prompt":  "watermark, text, logo, blurry, bad quality, bright colors, happy, cheerful",
                     "width":            576,
@@ -161,40 +479,34 @@ def generate_leonardo(prompt, style, index, output_dir):
                     "num_images":       1,
                     "guidance_scale":   7,
                     "num_inference_steps": 15,
-                },
+                }),
                 timeout=30,
             )
 
             if resp.status_code == 200:
-                gen_id = resp.json().get("sdGenerationJob", {}).get("generationId")
+                gen_id = _json(resp).get("sdGenerationJob", {}).get("generationId")
                 if not gen_id:
                     rotate_key()
                     continue
 
-                for _ in range(12):
-                    time.sleep(5)
-                    poll = requests.get(
-                        f"https://cloud.leonardo.ai/api/rest/v1/generations/{gen_id}",
-                        headers={"Authorization": f"Bearer {key}"},
-                        timeout=30,
-                    )
-                    if poll.status_code == 200:
-                        imgs = poll.json().get("generations_by_pk", {}).get("generated_images", [])
-                        if imgs:
-                            img_resp = requests.get(imgs[0]["url"], timeout=30)
-                            if img_resp.status_code == 200:
-                                out = os.path.join(output_dir, f"beat_{index:02d}_leonardo.jpg")
-                                with open(out, "wb") as f:
-                                    f.write(img_resp.content)
-                                print(f"  ✅ Leonardo key {(current_key_index % len(LEONARDO_KEYS))+1}: beat {index} ({tokens} tokens left)")
-                                return out
+                img_url = _await_generation(gen_id, key)
+                if img_url:
+                    out = os.path.join(output_dir, f"beat_{index:02d}_leonardo.jpg")
+                    if _save_stream(img_url, out):
+                        left   = _debit_balance(key)
+                        tokens = max(0, tokens - _GEN_COST) if left is None else left
+                        print(f"  ✅ Leonardo key {(current_key_index % len(LEONARDO_KEYS))+1}: beat {index} ({tokens} tokens left)")
+                        return out
                 rotate_key()
 
             elif resp.status_code == 429:
                 print(f"  ⚠️  Rate limit key {(current_key_index % len(LEONARDO_KEYS))+1} — rotating")
+                _set_balance(key, None)
                 rotate_key()
             else:
                 print(f"  ❌ Leonardo error: {resp.status_code}")
+                if resp.status_code == 401:
+                    _set_balance(key, None)
                 rotate_key()
 
         except Exception as e:
@@ -209,22 +521,19 @@ def generate_leonardo(prompt, style, index, output_dir):
 # ============================================================
 def get_pexels_fallback(prompt, index, output_dir):
     try:
-        query = " ".join(prompt.split()[:5])
+        query = " ".join(_first_words(prompt, 5))
         page  = random.randint(1, 4)
-        resp  = requests.get(
-            "https://api.pexels.com/v1/search",
+        data  = _search_json(
+            "pexels", "https://api.pexels.com/v1/search",
             headers={"Authorization": PEXELS_API_KEY},
             params={"query": query, "per_page": 15, "orientation": "portrait", "page": page},
         )
-        if resp.status_code == 200:
-            photos = resp.json().get("photos", [])
+        if data:
+            photos = data.get("photos", [])
             if photos:
                 img_url  = random.choice(photos)["src"]["large2x"]
-                img_resp = requests.get(img_url, timeout=30)
-                if img_resp.status_code == 200:
-                    out = os.path.join(output_dir, f"beat_{index:02d}_pexels.jpg")
-                    with open(out, "wb") as f:
-                        f.write(img_resp.content)
+                out      = os.path.join(output_dir, f"beat_{index:02d}_pexels.jpg")
+                if _save_stream(img_url, out):
                     adaptive_darken(out)
                     print(f"  ✅ Pexels photo beat {index} (darkened)")
                     return out
@@ -239,9 +548,9 @@ def get_pexels_fallback(prompt, index, output_dir):
 # ============================================================
 def get_pixabay_fallback(prompt, index, output_dir):
     try:
-        query = "+".join(prompt.split()[:3])
-        resp  = requests.get(
-            "https://pixabay.com/api/",
+        query = "+".join(_first_words(prompt, 3))
+        data  = _search_json(
+            "pixabay", "https://pixabay.com/api/",
             params={
                 "key":        PIXABAY_API_KEY,
                 "q":          query,
@@ -250,15 +559,12 @@ def get_pixabay_fallback(prompt, index, output_dir):
                 "image_type": "photo",
             },
         )
-        if resp.status_code == 200:
-            hits = resp.json().get("hits", [])
+        if data:
+            hits = data.get("hits", [])
             if hits:
                 img_url  = random.choice(hits).get("largeImageURL", "")
-                img_resp = requests.get(img_url, timeout=30)
-                if img_resp.status_code == 200:
-                    out = os.path.join(output_dir, f"beat_{index:02d}_pixabay.jpg")
-                    with open(out, "wb") as f:
-                        f.write(img_resp.content)
+                out      = os.path.join(output_dir, f"beat_{index:02d}_pixabay.jpg")
+                if _save_stream(img_url, out):
                     adaptive_darken(out)
                     print(f"  ✅ Pixabay photo beat {index} (darkened)")
                     return out
@@ -289,11 +595,8 @@ def fetch_gaming_clip(beat_num, clips_dir):
     """Search for safe gaming/gameplay footage as last-resort clip fallback."""
     query = random.choice(GAMING_QUERIES)
     print(f"  🎮 Gaming clip fallback: '{query}'")
-    result = fetch_pexels_video(query, beat_num, clips_dir)
-    if result:
-        return result
-    result = fetch_pixabay_video(query, beat_num, clips_dir)
-    return result
+    return _first_of(lambda: fetch_pexels_video(query, beat_num, clips_dir),
+                     lambda: fetch_pixabay_video(query, beat_num, clips_dir))
 
 
 # ============================================================
@@ -302,25 +605,20 @@ def fetch_gaming_clip(beat_num, clips_dir):
 def fetch_pexels_video(keywords, beat_num, clips_dir):
     try:
         page = random.randint(1, 3)
-        resp = requests.get(
-            "https://api.pexels.com/videos/search",
+        data = _search_json(
+            "pexels", "https://api.pexels.com/videos/search",
             headers={"Authorization": PEXELS_API_KEY},
-            params={"query": keywords, "per_page": 15, "orientation": "portrait", "page": page},
-            timeout=30,
+            params={"query": keywords, "per_page": 5, "orientation": "portrait", "page": page},
         )
-        if resp.status_code == 200:
-            videos = resp.json().get("videos", [])
+        if data:
+            videos = data.get("videos", [])
             if videos:
                 video     = random.choice(videos[:5])
                 mp4_files = [f for f in video.get("video_files", []) if f.get("file_type") == "video/mp4"]
                 if mp4_files:
-                    mp4_files.sort(key=lambda x: abs(x.get("width", 0) - 720))
-                    vid_resp = requests.get(mp4_files[0]["link"], timeout=60, stream=True)
-                    if vid_resp.status_code == 200:
-                        out = os.path.join(clips_dir, f"beat_{beat_num:02d}_pexels.mp4")
-                        with open(out, "wb") as f:
-                            for chunk in vid_resp.iter_content(8192):
-                                f.write(chunk)
+                    best = min(mp4_files, key=lambda x: abs(x.get("width", 0) - 720))
+                    out  = os.path.join(clips_dir, f"beat_{beat_num:02d}_pexels.mp4")
+                    if _save_stream(best["link"], out, timeout=60, chunk=1 << 20):
                         print(f"  ✅ Pexels video beat {beat_num}: {keywords}")
                         return out
         return None
@@ -334,25 +632,20 @@ def fetch_pexels_video(keywords, beat_num, clips_dir):
 # ============================================================
 def fetch_pixabay_video(keywords, beat_num, clips_dir):
     try:
-        query = "+".join(keywords.split()[:4])
-        resp  = requests.get(
-            "https://pixabay.com/api/videos/",
-            params={"key": PIXABAY_API_KEY, "q": query, "per_page": 10, "video_type": "film"},
-            timeout=30,
+        query = "+".join(_first_words(keywords, 4))
+        data  = _search_json(
+            "pixabay", "https://pixabay.com/api/videos/",
+            params={"key": PIXABAY_API_KEY, "q": query, "per_page": 5, "video_type": "film"},
         )
-        if resp.status_code == 200:
-            hits = resp.json().get("hits", [])
+        if data:
+            hits = data.get("hits", [])
             if hits:
                 video = random.choice(hits[:5])
                 for quality in ["medium", "small", "large"]:
                     url = video.get("videos", {}).get(quality, {}).get("url")
                     if url:
-                        vid_resp = requests.get(url, timeout=60, stream=True)
-                        if vid_resp.status_code == 200:
-                            out = os.path.join(clips_dir, f"beat_{beat_num:02d}_pixabay.mp4")
-                            with open(out, "wb") as f:
-                                for chunk in vid_resp.iter_content(8192):
-                                    f.write(chunk)
+                        out = os.path.join(clips_dir, f"beat_{beat_num:02d}_pixabay.mp4")
+                        if _save_stream(url, out, timeout=60, chunk=1 << 20):
                             print(f"  ✅ Pixabay video beat {beat_num}: {keywords}")
                             return out
         return None
@@ -371,6 +664,7 @@ VAGUE_SIGNALS = [
     "their phone", "their face", "their computer",
     "a mix of", "emotions", "showing", "looking at",
 ]
+_VAGUE_RE = re.compile("|".join(map(re.escape, VAGUE_SIGNALS)), re.IGNORECASE)
 
 DETAIL_INJECTIONS = [
     "extreme close-up filling the frame, face half-submerged in deep black shadow, single cold directional light source from below, hollow sunken eyes fixed on something off-frame in dread, film noir chiaroscuro contrast, ",
@@ -398,7 +692,7 @@ def enhance_prompt(prompt, style):
 
     # Word count check is PRIMARY — always inject if under 60 words or if vague signals detected
     word_count = len(prompt.split())
-    is_vague   = word_count < 60 or any(v in prompt.lower() for v in VAGUE_SIGNALS)
+    is_vague   = word_count < 60 or _VAGUE_RE.search(prompt) is not None
 
     if is_vague:
         injection = random.choice(DETAIL_INJECTIONS)
@@ -416,17 +710,30 @@ def enhance_prompt(prompt, style):
 # ============================================================
 # GENERATE SINGLE IMAGE (Leonardo → Pexels → Pixabay)
 # ============================================================
+# Leonardo results by (raw prompt digest, style) — keyed before enhancement,
+# whose random detail injection would otherwise give identical beats
+# different keys. A repeated beat reuses its image instead of re-billing.
+_PROMPT_CACHE = {}
+
+
 def generate_image(prompt, style, index, output_dir):
-    enhanced = enhance_prompt(prompt, style)
+    cache_key = (hashlib.blake2b(prompt.strip().encode(), digest_size=16).hexdigest(), style)
+    enhanced  = enhance_prompt(prompt, style)
     print(f"\n🎨 Image {index}: {enhanced[:80]}...")
+    cached    = _PROMPT_CACHE.get(cache_key)
+    if cached and os.path.exists(cached):
+        out = os.path.join(output_dir, f"beat_{index:02d}_leonardo.jpg")
+        if os.path.abspath(cached) != os.path.abspath(out):
+            shutil.copy(cached, out)
+        print(f"  ♻️  Leonardo: beat {index} reuses an identical prompt's image")
+        return out
     result = generate_leonardo(enhanced, style, index, output_dir)
     if result:
+        _PROMPT_CACHE[cache_key] = result
         return result
     # Pexels/Pixabay fallback: use original short prompt for keyword search
-    result = get_pexels_fallback(prompt, index, output_dir)
-    if result:
-        return result
-    result = get_pixabay_fallback(prompt, index, output_dir)
+    result = _first_of(lambda: get_pexels_fallback(prompt, index, output_dir),
+                       lambda: get_pixabay_fallback(prompt, index, output_dir))
     if result:
         return result
     print(f"  ❌ All image sources failed for beat {index}")
@@ -436,28 +743,26 @@ def generate_image(prompt, style, index, output_dir):
 # ============================================================
 # GENERATE ALL VISUALS — BEAT-LOCKED (visual_type from beat field)
 # ============================================================
-def generate_all_images(script_data, output_dir="images", clips_dir="clips"):
+def generate_all_images(script_data, output_dir="images", clips_dir="clips", cancel=None):
+    """
+    cancel: optional threading.Event — once set, beats not yet fetched are
+    skipped so the run can wind down early. The call only returns once every
+    fetch thread has stopped writing into output_dir / clips_dir.
+    """
     os.makedirs(output_dir, exist_ok=True)
     os.makedirs(clips_dir,  exist_ok=True)
 
     # Clear old files
     for d, exts in [(output_dir, (".jpg", ".png", ".mp4")), (clips_dir, (".mp4",))]:
-        for f in os.listdir(d):
-            if f.endswith(exts):
-                os.remove(os.path.join(d, f))
+        with os.scandir(d) as entries:
+            for entry in entries:
+                if entry.name.endswith(exts) and entry.is_file():
+                    os.unlink(entry.path)
 
     beats      = script_data.get("beats") or script_data.get("image_prompts", [])
     format_key = script_data.get("format", "story_lesson")
     vis_style  = FORMATS_VISUAL.get(format_key, "dark_cinematic")
 
-    style_map = {
-        "dark cinematic": "dark_cinematic",
-        "dark luxury":    "dark_luxury",
-        "horror":         "dark_horror",
-        "abstract":       "abstract_dark",
-        "illustrated":    "illustrated",
-    }
-
     print(f"\n🎨 Generating visuals for {len(beats)} beats  |  Style: {vis_style}")
     print(f"🎬 Beat visuals: Wikimedia photo > Pexels clip > Pixabay clip")
 
@@ -466,6 +771,7 @@ def generate_all_images(script_data, output_dir="images", clips_dir="clips"):
     # Reset per-run keyword tracking
     _used_keywords.clear()
     _used_wikimedia_urls: set = set()    # avoid same image twice across beats
+    _wiki_lock = threading.Lock()
 
     # ── Wikimedia Commons fetcher (public domain, story-relevant) ────────
     _WIKI_SKIP_WORDS = ("logo", "map", "flag", "icon", "seal", "coat", "symbol",
@@ -491,7 +797,7 @@ def generate_all_images(script_data, output_dir="images", clips_dir="clips"):
                     clean.append(wl.capitalize())
             query = " ".join(clean[:5]) if clean else keywords[:40]
 
-            search = requests.get(
+            search = _HTTP.get(
                 "https://commons.wikimedia.org/w/api.php",
                 params={"action":"query","list":"search","srsearch":query,
                         "srnamespace":6,"srlimit":15,"format":"json"},
@@ -500,7 +806,7 @@ def generate_all_images(script_data, output_dir="images", clips_dir="clips"):
             if search.status_code != 200:
                 return None
 
-            results = search.json().get("query",{}).get("search",[])
+            results = _json(search).get("query",{}).get("search",[])
             random.shuffle(results)
 
             for item in results:
@@ -511,7 +817,7 @@ def generate_all_images(script_data, output_dir="images", clips_dir="clips"):
                 if any(w in tl for w in _WIKI_SKIP_WORDS):
                     continue
 
-                info_r = requests.get(
+                info_r = _HTTP.get(
                     "https://commons.wikimedia.org/w/api.php",
                     params={"action":"query","titles":title,"prop":"imageinfo",
                             "iiprop":"url|size","format":"json"},
@@ -519,69 +825,39 @@ def generate_all_images(script_data, output_dir="images", clips_dir="clips"):
                 )
                 if info_r.status_code != 200:
                     continue
-                for pg in info_r.json().get("query",{}).get("pages",{}).values():
+                for pg in _json(info_r).get("query",{}).get("pages",{}).values():
                     info   = pg.get("imageinfo",[{}])[0]
                     url    = info.get("url","")
                     width  = info.get("width",0)
                     height = info.get("height",0)
                     if width < 400 or height < 400:
                         continue
-                    if url in _used_wikimedia_urls:
-                        continue
-                    img_r = requests.get(url, timeout=20,
+                    with _wiki_lock:            # claim it before another beat does
+                        if url in _used_wikimedia_urls:
+                            continue
+                        _used_wikimedia_urls.add(url)
+                    img_r = _HTTP.get(url, timeout=20,
                                          headers={"User-Agent":"DarkMindBot/1.0"})
                     if img_r.status_code == 200 and len(img_r.content) > 20_000:
                         out = os.path.join(output_dir, f"beat_{beat_num:02d}_wiki.jpg")
                         with open(out, "wb") as fh:
                             fh.write(img_r.content)
                         adaptive_darken(out)
-                        _used_wikimedia_urls.add(url)
                         print(f"  ✅ Wikimedia photo beat {beat_num}: {title[5:50]}")
                         return out
+                    with _wiki_lock:
+                        _used_wikimedia_urls.discard(url)
         except Exception as e:
             print(f"  ⚠️  Wikimedia beat {beat_num}: {e.__class__.__name__}")
         return None
 
-    STOCK_BLOCKLIST = {
-        "psychological", "psychology", "abstract", "invisible", "concept",
-        "emotion", "emotions", "metaphor", "symbolic", "theory", "mental",
-        "cognitive", "subconscious", "aversion", "bias", "bubble", "fomo",
-        "algorithm", "influence", "manipulation", "trick", "anchoring",
-        "persuasion", "heuristic", "effect", "principle", "technique",
-    }
-
-    # Well-known proper nouns stock libraries have NO footage of
-    PERSON_NAME_BLOCKLIST = {
-        "elon", "musk", "zuckerberg", "mark", "buffett", "warren", "bezos",
-        "gates", "bill", "jobs", "steve", "cialdini", "robert", "freud",
-        "trump", "obama", "biden", "powell", "munger", "dalio", "ray",
-        "soros", "george", "tesla", "facebook", "meta", "google", "apple",
-        "amazon", "microsoft", "twitter", "tiktok", "instagram", "youtube",
-    }
-
-    def _sanitize_keywords(kws):
-        """Strip abstract words and proper names that Pexels can't search for."""
-        if not kws:
-            return kws
-        words = kws.split()
-        filtered = []
-        for w in words:
-            wl = w.lower().rstrip("s,.")
-            if wl in STOCK_BLOCKLIST:
-                continue
-            if wl in PERSON_NAME_BLOCKLIST:
-                continue
-            # Skip likely proper nouns (capitalized, >2 chars, not the first word)
-            if filtered and w[0].isupper() and len(w) > 2 and not w.isupper():
-                continue
-            filtered.append(w)
-        return " ".join(filtered) if filtered else kws
-
+    # Keyword clean-up and de-duplication depend on earlier beats, so they
+    # run in order up front; the network fetches below are independent.
+    jobs = []
     for i, beat_data in enumerate(beats):
         beat_num      = beat_data.get("beat", i + 1)
         image_prompt  = beat_data.get("image_prompt") or beat_data.get("prompt", "")
         video_kws     = beat_data.get("video_keywords", "")
-        style         = style_map.get(beat_data.get("style", ""), vis_style)
 
         # Strip abstract/psychology words and proper names that stock libraries don't carry
         if video_kws:
@@ -611,56 +887,62 @@ def generate_all_images(script_data, output_dir="images", clips_dir="clips"):
                 variation_idx += 1
             _used_keywords.add(video_kws)
 
-        print(f"\n🎬 Beat {beat_num}: {(video_kws or image_prompt)[:55]}")
+        # Wikimedia uses the raw (unsanitized) keywords so proper names (Tesla, Disney) are kept
+        raw_kws = beat_data.get("video_keywords", "") or image_prompt
+        jobs.append((beat_num, image_prompt, video_kws, raw_kws))
 
-        result      = None
-        result_type = None
+    def _process_beat(beat_num, image_prompt, video_kws, raw_kws):
+        if cancel is not None and cancel.is_set():
+            return None, None
+        print(f"\n🎬 Beat {beat_num}: {(video_kws or image_prompt)[:55]}")
 
         # Tier 1: Wikimedia Commons — real public-domain photo of the story topic
-        # Use the raw (unsanitized) keywords so proper names (Tesla, Disney) are kept
-        raw_kws = beat_data.get("video_keywords", "") or image_prompt
         if raw_kws:
             result = _fetch_wikimedia(raw_kws, beat_num)
             if result:
-                result_type = "image"
-
-        # Tier 2: Pexels video clip
-        if not result and video_kws:
-            result = fetch_pexels_video(video_kws, beat_num, clips_dir)
-            if result:
-                result_type = "clip"
+                return result, "image"
 
-        # Tier 3: Pixabay video clip
-        if not result and video_kws:
-            result = fetch_pixabay_video(video_kws, beat_num, clips_dir)
+        # Tier 2/3: Pexels and Pixabay video clip, searched together
+        if video_kws:
+            result = _first_of(lambda: fetch_pexels_video(video_kws, beat_num, clips_dir),
+                               lambda: fetch_pixabay_video(video_kws, beat_num, clips_dir))
             if result:
-                result_type = "clip"
+                return result, "clip"
 
         # Tier 4: gaming clip — safe background for any topic
-        if not result:
-            print(f"  ⚠️  No topic visual — trying gaming footage for beat {beat_num}")
-            result = fetch_gaming_clip(beat_num, clips_dir)
-            if result:
-                result_type = "clip"
+        print(f"  ⚠️  No topic visual — trying gaming footage for beat {beat_num}")
+        result = fetch_gaming_clip(beat_num, clips_dir)
+        if result:
+            return result, "clip"
 
         # Tier 5: Pexels/Pixabay stock photo
-        if not result:
-            result = get_pexels_fallback(image_prompt, beat_num, output_dir)
-            if not result:
-                result = get_pixabay_fallback(image_prompt, beat_num, output_dir)
+        result = _first_of(lambda: get_pexels_fallback(image_prompt, beat_num, output_dir),
+                           lambda: get_pixabay_fallback(image_prompt, beat_num, output_dir))
+        return result, "image"
+
+    # Beats are network-bound and write to per-beat files — fetch them side
+    # by side, then collect in beat order
+    with ThreadPoolExecutor(max_workers=VISUAL_WORKERS) as pool:
+        futures = [pool.submit(_process_beat, *job) for job in jobs]
+        for (beat_num, *_), fut in zip(jobs, futures):
+            try:
+                result, result_type = fut.result()
+            except Exception as e:
+                print(f"  ❌ Beat {beat_num} error: {e}")
+                result = None
             if result:
-                result_type = "image"
-
-        if result and result_type:
-            generated_visuals.append({
-                "path":  result,
-                "type":  result_type,
-                "beat":  beat_num,
-            })
-        else:
-            print(f"  ❌ All sources failed for beat {beat_num}")
-
-        time.sleep(0.8)
+                generated_visuals.append({
+                    "path":  result,
+                    "type":  result_type,
+                    "beat":  beat_num,
+                })
+            elif not (cancel is not None and cancel.is_set()):
+                print(f"  ❌ All sources failed for beat {beat_num}")
+    _drain_stragglers()
+
+    if cancel is not None and cancel.is_set():
+        print(f"\n🛑 Visual generation cancelled after {len(generated_visuals)} beats")
+        return []
 
     clips_n  = sum(1 for v in generated_visuals if v["type"] == "clip")
     images_n = sum(1 for v in generated_visuals if v["type"] == "image")
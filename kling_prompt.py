@@ -1,4 +1,5 @@
 import os
+import json
 import random
 from dotenv import load_dotenv
 from groq import Groq
@@ -63,7 +64,6 @@ Return ONLY a JSON object:
     )
 
     try:
-        import json
         content = response.choices[0].message.content.strip()
         if "```" in content:
             content = content.split("```")[1]
@@ -6,14 +6,18 @@ Usage:
     python run_pipeline.py --trend "trending thing" # trend-aware topic
 """
 import os
-import re
 import sys
 import json
 import time
 import random
 import argparse
+import threading
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+from analytics import get_all_used_topics, get_used_hooks, log_video, save_platform_ids
+from assembler import TEMP_DIR as ASSEMBLER_TEMP_DIR, assemble_video, get_audio_duration
 
 if sys.platform == "win32" and hasattr(sys.stdout, "reconfigure"):
     sys.stdout.reconfigure(encoding="utf-8", errors="replace")
@@ -36,29 +40,53 @@ _STOP = {
     "no","so","if","as","can","will","just","about","into","its","s","your",
 }
 
+# Deletes every ASCII char except a-z, 0-9 and space; non-ASCII is dropped
+# by the encode step before it
+_CLEAN_TABLE = str.maketrans("", "", "".join(
+    c for c in map(chr, range(128)) if not (c.islower() or c.isdigit() or c == " ")
+))
+
 
+@lru_cache(maxsize=4096)
 def _topic_words(topic):
-    """Return meaningful lowercased words from a topic string."""
-    return set(re.sub(r"[^a-z0-9 ]", "", topic.lower()).split()) - _STOP
+    """Return meaningful lowercased words from a topic string (cached, hashable)."""
+    clean = topic.lower().encode("ascii", "ignore").decode("ascii").translate(_CLEAN_TABLE)
+    return frozenset(w for w in clean.split() if w not in _STOP)
+
+
+def _prep_used_info(used_info):
+    """
+    Tokenize the used / pumped topics once per selection run.
+    Returns the word sets _topic_is_fresh has to compare against: topics
+    that went viral (pumped) are dropped, as are ones with fewer than 3
+    meaningful words — they can never reach the 3-word overlap.
+    """
+    pumped = {_topic_words(p) for p in used_info.get("pumped", [])}
+    used   = (_topic_words(u) for u in used_info.get("used", []))
+    return [w for w in used if len(w) >= 3 and w not in pumped]
 
 
-def _topic_is_fresh(candidate, used_info):
+def _topic_is_fresh(candidate, used_words):
     """
     True  → topic is new (safe to use).
     False → topic was already used AND did NOT go viral (skip it).
     A topic that DID go viral (pumped=1) is always allowed to repeat.
+    used_words comes from _prep_used_info.
     """
     cand_words = _topic_words(candidate)
-    pumped_set = {_topic_words(p) for p in used_info.get("pumped", [])}
-
-    for used in used_info.get("used", []):
-        used_words = _topic_words(used)
-        # Allow if this exact used topic went viral
-        if used_words in pumped_set:
-            continue
-        # Overlap of 3+ meaningful words = same topic
-        if len(cand_words & used_words) >= 3:
-            return False
+    if len(cand_words) < 3:
+        return True
+
+    for words in used_words:
+        # Overlap of 3+ meaningful words = same topic — count over the
+        # smaller set and stop at the third shared word
+        small, big = (cand_words, words) if len(cand_words) < len(words) else (words, cand_words)
+        shared = 0
+        for w in small:
+            if w in big:
+                shared += 1
+                if shared >= 3:
+                    return False
     return True
 
 
@@ -92,19 +120,21 @@ def _pick_fresh_topic(trends, used_info):
     )
     print(f"   📊 Format ranking this run: {' > '.join(sorted_formats)}")
 
+    used_words = _prep_used_info(used_info)
+
+    def _candidates(intel, fmt):
+        yield intel.get("best_topic_right_now", "")
+        yield from intel.get("main_topics", [])[:4]
+        yield from trends.get(fmt, [])
+
+    seen = set()     # the same topic can come from intel and trends — check it once
     for fmt in sorted_formats:
         intel = get_intelligence_for_format(fmt)
-        candidates = []
-        best = intel.get("best_topic_right_now", "")
-        if best:
-            candidates.append(best)
-        candidates += intel.get("main_topics", [])[:4]
-        candidates += trends.get(fmt, [])
-
-        for topic in candidates:
-            if not topic:
+        for topic in _candidates(intel, fmt):
+            if not topic or topic in seen:
                 continue
-            if _topic_is_fresh(topic, used_info):
+            seen.add(topic)
+            if _topic_is_fresh(topic, used_words):
                 return topic, fmt
             else:
                 print(f"   ⚠️  Skipping '{topic[:60]}' — already used")
@@ -124,26 +154,41 @@ def ensure_dirs():
 # CLEAN WORKSPACE — wipe all generated files before each run
 # Guarantees no stale images/clips/temp from a previous run
 # ============================================================
+def _safe_unlink(path):
+    try:
+        os.unlink(path)
+        return 1
+    except OSError:
+        return 0
+
+
 def clean_workspace():
     rules = {
-        "images": (".jpg", ".png", ".mp4"),
-        "clips":  (".mp4",),
+        "images": frozenset({".jpg", ".png", ".mp4"}),
+        "clips":  frozenset({".mp4"}),
         "temp":   None,          # wipe everything in temp
     }
-    total = 0
-    for folder, exts in rules.items():
-        d = BASE_DIR / folder
+    dirs = [(BASE_DIR / folder, exts) for folder, exts in rules.items()]
+    # DARKMIND_RAM_TEMP moves the assembler's temp dir (e.g. into /dev/shm)
+    # — wipe it too, or intermediates pile up in RAM across scheduled runs
+    if ASSEMBLER_TEMP_DIR.resolve() != (BASE_DIR / "temp").resolve():
+        dirs.append((ASSEMBLER_TEMP_DIR, None))
+
+    stale = []
+    for d, exts in dirs:
         if not d.exists():
             continue
-        for f in d.iterdir():
-            if not f.is_file():
-                continue
-            if exts is None or f.suffix.lower() in exts:
-                try:
-                    f.unlink()
-                    total += 1
-                except Exception:
-                    pass
+        # scandir's DirEntry carries the file type — no extra stat per file
+        with os.scandir(d) as entries:
+            for entry in entries:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+                if exts is None or os.path.splitext(entry.name)[1].lower() in exts:
+                    stale.append(entry.path)
+
+    # unlink drops the GIL — keep several in flight on slow/network disks
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        total = sum(pool.map(_safe_unlink, stale))
     print(f"🧹 Workspace clean — {total} old files removed")
 
 
@@ -166,7 +211,8 @@ def run_pipeline(manual_idea=None, trend_data=None, viral_followup=False):
     # Viral follow-ups skip scrape — same topic, new script
     # All other runs always scrape fresh
     # ──────────────────────────────────────────────────────
-    trends = {}
+    trends      = {}
+    flat_trends = []
     if viral_followup:
         print("🔁 STEP 0/4 — Viral Follow-Up (skipping scrape, same topic)")
     else:
@@ -175,14 +221,15 @@ def run_pipeline(manual_idea=None, trend_data=None, viral_followup=False):
             from trend_research import get_trending_topics, get_intelligence_for_format
             trends = get_trending_topics()   # always fresh — no cache
             if trends:
-                print(f"   Trends loaded — {sum(len(v) for v in trends.values())} topics across formats")
+                flat_trends = [t for v in trends.values() for t in v if t]
+                print(f"   Trends loaded — {len(flat_trends)} topics across formats")
         except Exception as e:
             print(f"   ⚠️  Trend research skipped: {e}")
 
     # If no manual idea — pick best FRESH topic from trend intelligence
+    used_info = None
     if not manual_idea and not trend_data and trends:
         try:
-            from analytics import get_all_used_topics
             used_info = get_all_used_topics()
             if used_info["used"]:
                 print(f"   📋 Topics already used: {len(used_info['used'])}  |  Pumped (reusable): {len(used_info['pumped'])}")
@@ -196,15 +243,13 @@ def run_pipeline(manual_idea=None, trend_data=None, viral_followup=False):
             else:
                 # All known topics used — force a full fresh scrape then try again
                 # All live-scraped topics already used — last resort: reuse oldest
-                all_topics = [t for v in trends.values() for t in v if t]
-                if all_topics:
-                    manual_idea = all_topics[0]
+                if flat_trends:
+                    manual_idea = flat_trends[0]
                     print(f"   ⚠️  All topics used before — reusing oldest: {manual_idea[:80]}")
         except Exception as exc:
             print(f"   ⚠️  Topic selection error: {exc}")
-            all_topics = [t for v in trends.values() for t in v]
-            if all_topics:
-                trend_data = all_topics[0]
+            if flat_trends:
+                trend_data = flat_trends[0]
                 print(f"   Injecting trend: {trend_data}")
 
     # ──────────────────────────────────────────────────────
@@ -212,9 +257,8 @@ def run_pipeline(manual_idea=None, trend_data=None, viral_followup=False):
     # ──────────────────────────────────────────────────────
     print(f"\n📝 STEP 1/4 — Script")
     from script_writer import generate_script
-    from analytics import get_all_used_topics, get_used_hooks
 
-    _used_info   = get_all_used_topics()
+    _used_info   = used_info or get_all_used_topics()    # reuse topic-selection read
     _used_hooks  = get_used_hooks(limit=20)
     _used_topics = _used_info.get("used", [])
     if _used_topics:
@@ -250,37 +294,54 @@ def run_pipeline(manual_idea=None, trend_data=None, viral_followup=False):
     images  = None
     vo_result = None
 
+    # Both stages must succeed — stop as soon as either one fails instead of
+    # sitting out the slower stage. Image fetching is told to wind down, and
+    # the executor is joined so no stage is still writing into images/ or
+    # clips/ when the next (retry) run starts cleaning them.
+    cancel = threading.Event()
     with ThreadPoolExecutor(max_workers=2) as executor:
         future_images = executor.submit(
             generate_all_images,
             script_data,
             str(BASE_DIR / "images"),
             str(BASE_DIR / "clips"),
+            cancel,
         )
-        future_voice = executor.submit(
+        future_voice  = executor.submit(
             generate_voiceover,
             script_data,
             vo_path,
         )
 
-        for future in as_completed([future_images, future_voice]):
-            try:
-                if future is future_images:
-                    images    = future.result()
-                    img_count = len(images) if images else 0
-                    print(f"\n   🎨 Images done: {img_count} visuals")
-                else:
-                    vo_result = future.result()
-                    print(f"\n   🎙️  Voiceover done: {vo_result}")
-            except Exception as e:
-                label = "Images" if future is future_images else "Voiceover"
-                print(f"\n   ❌ {label} thread raised exception: {e}")
-
-    if not images:
-        print("❌ Pipeline stopped: image generation failed")
-        return None
-    if not vo_result:
-        print("❌ Pipeline stopped: voiceover generation failed")
+        pending = {future_images, future_voice}
+        failed  = None
+        while pending and not failed:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    if future is future_images:
+                        images    = future.result()
+                        img_count = len(images) if images else 0
+                        print(f"\n   🎨 Images done: {img_count} visuals")
+                        failed    = failed or (None if images else "image generation")
+                    else:
+                        vo_result = future.result()
+                        print(f"\n   🎙️  Voiceover done: {vo_result}")
+                        failed    = failed or (None if vo_result else "voiceover generation")
+                except Exception as e:
+                    label = "Images" if future is future_images else "Voiceover"
+                    print(f"\n   ❌ {label} thread raised exception: {e}")
+                    failed = failed or ("image generation" if future is future_images
+                                        else "voiceover generation")
+        if failed:
+            cancel.set()
+            for future in pending:
+                future.cancel()
+            if pending:
+                print("   ⏳ Waiting for the other stage to stop...")
+
+    if failed:
+        print(f"❌ Pipeline stopped: {failed} failed")
         return None
 
     clips_n  = sum(1 for v in images if v["type"] == "clip")
@@ -288,7 +349,6 @@ def run_pipeline(manual_idea=None, trend_data=None, viral_followup=False):
     print(f"✅ {len(images)} visuals ready ({clips_n} clips, {images_n} images)")
 
     # ── 60s minimum check — keep regenerating until output is long enough ──
-    from assembler import get_audio_duration
     SPEED        = 1.3
     MIN_OUTPUT_S = 60.0
     vo_dur       = get_audio_duration(vo_result)
@@ -318,7 +378,6 @@ def run_pipeline(manual_idea=None, trend_data=None, viral_followup=False):
     # STEP 4: Assembly
     # ──────────────────────────────────────────────────────
     print(f"\n🎬 STEP 4/4 — Assembly")
-    from assembler import assemble_video
 
     out_path = str(BASE_DIR / f"output/dark_mind_{run_id}.mp4")
     result   = assemble_video(
@@ -333,7 +392,6 @@ def run_pipeline(manual_idea=None, trend_data=None, viral_followup=False):
     # ──────────────────────────────────────────────────────
     if result:
         try:
-            from analytics import log_video
             log_video(run_id, script_data, result)
         except Exception as e:
             print(f"   ⚠️  Analytics log failed: {e}")
@@ -375,7 +433,6 @@ def run_pipeline(manual_idea=None, trend_data=None, viral_followup=False):
         # Save platform IDs to analytics
         if yt_id or tt_id:
             try:
-                from analytics import save_platform_ids
                 save_platform_ids(run_id, yt_id, tt_id)
             except Exception as e:
                 print(f"   ⚠️  Platform ID save failed: {e}")
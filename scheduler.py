@@ -35,15 +35,30 @@ CHECK_INTERVAL_MIN = 5    # How often to check if it's time to run (minutes)
 _DEFAULT_MAX_VIDEOS = 4   # Fallback if settings.json not found
 
 
+# settings.json is re-checked at most once a minute and only re-parsed when
+# its mtime changes — edits from the dashboard still apply promptly.
+# "checked" starts at -inf so the first call always reads the file
+# (monotonic() counts from boot, so 0.0 could still be within the minute).
+_settings_cache = {"mtime": None, "value": _DEFAULT_MAX_VIDEOS, "checked": float("-inf")}
+
+
 def get_max_videos_per_day() -> int:
+    now = time.monotonic()
+    if now - _settings_cache["checked"] < 60:
+        return _settings_cache["value"]
+    _settings_cache["checked"] = now
+    settings_path = BASE_DIR / "settings.json"
     try:
-        settings_path = BASE_DIR / "settings.json"
-        if settings_path.exists():
+        mtime = settings_path.stat().st_mtime_ns
+        if mtime != _settings_cache["mtime"]:
             data = json.loads(settings_path.read_text(encoding="utf-8"))
-            return int(data.get("max_videos_per_day", _DEFAULT_MAX_VIDEOS))
+            _settings_cache["value"] = int(data.get("max_videos_per_day", _DEFAULT_MAX_VIDEOS))
+            _settings_cache["mtime"] = mtime
+    except FileNotFoundError:
+        _settings_cache.update(mtime=None, value=_DEFAULT_MAX_VIDEOS)
     except Exception:
         pass
-    return _DEFAULT_MAX_VIDEOS
+    return _settings_cache["value"]
 
 # Psychology-backed peak hours per weekday (0=Monday, 6=Sunday)
 # These inform the scheduler to PREFER running during these windows.
@@ -68,6 +83,7 @@ _daily_run_count = {"date": "", "count": 0}
 
 # Daily adaptive schedule cache (rebuilt each new day)
 _today_schedule  = []
+_today_schedule_map = {}         # hour -> jittered minute for _today_schedule
 _schedule_date   = ""
 
 # Stats fetch tracking
@@ -129,10 +145,10 @@ def build_daily_schedule():
     learned = []
     tier    = "psychology"
     try:
-        from analytics import get_best_hours_for_day, get_hour_confidence
-        learned = get_best_hours_for_day(weekday, n=max_vids)
-        conf    = get_hour_confidence(weekday)
-        tier    = conf.get("tier", "psychology")
+        from analytics import get_schedule_insights
+        insights = get_schedule_insights(weekday, n=max_vids)
+        learned  = insights.hours
+        tier     = insights.tier
     except Exception:
         pass
 
@@ -172,11 +188,12 @@ def build_daily_schedule():
 
 def get_today_schedule():
     """Return (and cache) today's posting schedule. Rebuilds at midnight."""
-    global _today_schedule, _schedule_date
+    global _today_schedule, _today_schedule_map, _schedule_date
     today = datetime.now().strftime("%Y-%m-%d")
     if _schedule_date != today or not _today_schedule:
-        _today_schedule = build_daily_schedule()
-        _schedule_date  = today
+        _today_schedule     = build_daily_schedule()
+        _today_schedule_map = dict(_today_schedule)
+        _schedule_date      = today
     return _today_schedule
 
 
@@ -196,16 +213,15 @@ def should_run_now():
         return False, f"Daily cap reached ({count}/{max_vids})"
 
     # Check against today's jittered schedule (list of (hour, minute) tuples)
-    schedule = get_today_schedule()
-    schedule_hours = [h for h, m in schedule]
+    schedule      = get_today_schedule()
+    target_minute = _today_schedule_map.get(now.hour)
 
-    if now.hour not in schedule_hours:
+    if target_minute is None:
         future = [(h, m) for h, m in schedule if h > now.hour]
         nxt    = f"{future[0][0]:02d}:{future[0][1]:02d}" if future else "none remaining today"
         return False, f"Not a scheduled slot — next: {nxt}"
 
     # We're in a scheduled hour — check if we've hit or passed the target minute
-    target_minute = next(m for h, m in schedule if h == now.hour)
     if now.minute < target_minute:
         return False, f"Waiting for :{target_minute:02d} (now :{now.minute:02d})"
 
@@ -287,7 +303,7 @@ def run_once(force=False):
     print(f"  🤖 AUTO-RUN — {now.strftime('%A %Y-%m-%d %H:%M')}")
     schedule = get_today_schedule()
     schedule_str = ", ".join(f"{h:02d}:{m:02d}" for h, m in schedule) or "none"
-    in_slot = datetime.now().hour in [h for h, m in schedule]
+    in_slot = datetime.now().hour in _today_schedule_map
     print(f"  Scheduled   : {schedule_str}  {'← NOW 🔥' if in_slot else ''}")
     print(f"  Daily count : {get_daily_count()}/{get_max_videos_per_day()}")
     print(f"{sep}")
@@ -389,13 +405,13 @@ def start_scheduler():
         pass
 
     # Build and show today's adaptive schedule
-    todays_schedule = get_today_schedule()
+    get_today_schedule()
 
     # Schedule the check every N minutes
     schedule.every(CHECK_INTERVAL_MIN).minutes.do(run_once)
 
     # If current hour is already a scheduled slot → run immediately
-    if is_active_hour() and now.hour in [h for h, m in todays_schedule]:
+    if is_active_hour() and now.hour in _today_schedule_map:
         ok, reason = should_run_now()
         if ok:
             print(f"🔥 Current hour ({now.strftime('%H:%M')}) is a scheduled slot — starting now!")
@@ -19,7 +19,8 @@ def fetch_and_update_all():
     Fetch stats for all recently uploaded videos (last 30 days).
     Merges YouTube + TikTok data and calls update_performance().
     """
-    from analytics import get_videos_for_stats_fetch, update_performance
+    from analytics import (batch, get_videos_for_stats_fetch,
+                           recalculate_aggregates, update_performance)
 
     videos = get_videos_for_stats_fetch(max_age_days=30)
     if not videos:
@@ -28,7 +29,9 @@ def fetch_and_update_all():
 
     print(f"\n📊 [{datetime.now().strftime('%H:%M')}] Fetching stats for {len(videos)} video(s)…")
 
-    updated = 0
+    # Network fetches happen first; the DB writes are then applied together
+    # in one transaction so the whole refresh costs a single commit.
+    pending = []
     for v in videos:
         run_id     = v["run_id"]
         youtube_id = v.get("youtube_id", "")
@@ -66,15 +69,22 @@ def fetch_and_update_all():
         }
 
         # Only update if numbers went up (never overwrite with stale data)
-        if merged["views"] > v.get("views", 0) or updated == 0:
+        if merged["views"] > v.get("views", 0) or not pending:
+            pending.append((run_id, merged))
+
+    with batch():
+        for run_id, merged in pending:
             update_performance(
                 run_id,
                 views=merged["views"],
                 likes=merged["likes"],
                 comments=merged["comments"],
                 shares=merged["shares"],
+                recalc=False,
             )
-            updated += 1
+        if pending:
+            recalculate_aggregates()
+    updated = len(pending)
 
     print(f"  [Stats] Done — {updated}/{len(videos)} records updated.")
     return updated